@@ -1,20 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, WebSocket, WebSocketDisconnect
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional
 import asyncio
 from datetime import datetime, timedelta
 import json
 import httpx
 import numpy as np
 
-from backend.db.database import get_db, SessionLocal
+from backend.db.database import get_db, AsyncSessionLocal
 from backend.models.flight import Flight
 from backend.models.seat import Seat
 from backend.models.purchase_history import PurchaseHistory
 from backend.websocket.ws_manager import manager
+from backend.websocket.event_log import flight_event_log
+from backend.websocket.seat_codec import seat_codec, check_format, FORMAT_JSON, FORMAT_COMPACT
 from backend.utils.constants import flight_state_manager
-from backend.services.countdown_service import countdown_service
+from backend.services.countdown_service import countdown_service, booking_window_query
 from backend.services.bot_service import bot_service
+from backend.services.purchase_history_service import purchase_history_service
+from backend.services.purchase_event_service import purchase_event_service
+from backend.services.hold_service import hold_service
+from backend.services.inventory_service import inventory_service, FlightInventory
+from backend.services.seat_map_cache import seat_map_cache
+from backend.services.command_service import command_service, CommandResult
+from backend.websocket.commands import Command, PurchaseCommand, GroupPurchaseCommand, HoldCommand, parse_command
 
 router = APIRouter()
 
@@ -71,29 +81,116 @@ def get_flight(flight_id: int, db: Session = Depends(get_db)):
     }
 
 @router.get("/flights/{flight_id}/seats", response_model=List[dict])
-def get_flight_seats(flight_id: int, db: Session = Depends(get_db)):
-    flight = db.query(Flight).filter(Flight.id == flight_id).first()
-    if not flight:
-        raise HTTPException(status_code=404, detail="Flight not found")
+async def get_flight_seats(flight_id: int, format: str = FORMAT_JSON, layout_id: Optional[str] = None,
+                           if_none_match: Optional[str] = Header(default=None)):
+    """
+    Every seat of a flight, served from a cached snapshot of the in-memory inventory.
+    The response carries an ETag; a client sending it back gets a 304 until a seat sells.
+    format=compact returns the compact seat map, leaving out the static layout when
+    layout_id names the one the client already has.
+    """
+    try:
+        format = check_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # On the event loop, so a first load can't race one made by the bots or a buyer;
+    # departed and unknown flights are served without keeping their inventory
+    inventory = await inventory_service.get_async(flight_id, keep=inventory_service.is_live(flight_id))
+    if inventory is None:
+        async with AsyncSessionLocal() as db:
+            if await db.scalar(select(Flight.id).where(Flight.id == flight_id)) is None:
+                raise HTTPException(status_code=404, detail="Flight not found")
+        return []
     
-    seats = db.query(Seat).filter(Seat.flight_id == flight_id).all()
-    return [
-        {
-            "id": seat.id,
-            "row_number": seat.row_number,
-            "seat_letter": seat.seat_letter,
-            "is_occupied": seat.is_occupied,
-            "class_type": seat.class_type,
-            "is_window": seat.is_window,
-            "is_aisle": seat.is_aisle,
-            "is_middle": seat.is_middle,
-            "is_extra_legroom": seat.is_extra_legroom,
-            "base_price": seat.base_price,
-            "sale_price": seat.sale_price,
-            "days_until_departure": seat.days_until_departure
-        }
-        for seat in seats
-    ]
+    if format == FORMAT_COMPACT:
+        include_layout = layout_id != seat_codec.layout(inventory).layout_id
+        snapshot = seat_map_cache.get(
+            inventory, "compact+layout" if include_layout else "compact",
+            lambda inventory, seats: seat_codec.encode_seat_map(inventory, seats, include_layout)
+        )
+    else:
+        snapshot = seat_map_cache.get(inventory)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if seat_map_cache.matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+@router.get("/seat-layouts/{layout_id}", response_model=dict)
+def get_seat_layout(layout_id: str):
+    """The static part of a compact seat map; a layout never changes once created"""
+    template = seat_codec.get_layout(layout_id)
+    if template is None:
+        raise HTTPException(status_code=404, detail="Seat layout not found")
+    return Response(
+        content=json.dumps(template.to_dict(), separators=(",", ":")),
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+def build_seat_snapshot(inventory: FlightInventory) -> dict:
+    """
+    Snapshot of a flight for clients whose resume gap is too old: sold seats and the clock.
+    Taken from the in-memory inventory together with the current seq (nothing awaits in
+    between), so it holds exactly the sales up to that seq, including unflushed ones.
+    """
+    flight_id = inventory.flight_id
+    _, seats = inventory.seat_map()
+    snapshot = {
+        "type": "SNAPSHOT",
+        "seq": flight_event_log.current_seq(flight_id),
+        "seats": [
+            {
+                "id": seat['id'],
+                "is_occupied": True,
+                "sale_price": seat['sale_price'],
+                "days_until_departure": seat['days_until_departure']
+            }
+            for seat in seats if seat['is_occupied']
+        ]
+    }
+    if flight_state_manager.is_flight_active(flight_id):
+        total_hours = flight_state_manager.get_hours_remaining(flight_id)
+        snapshot["days_until_departure"] = total_hours // 24
+        snapshot["hours"] = total_hours % 24
+    return snapshot
+
+def build_compact_snapshot(inventory: FlightInventory) -> dict:
+    """The compact seat map (without its layout) as a snapshot"""
+    flight_id = inventory.flight_id
+    _, seats = inventory.seat_map()
+    snapshot = {
+        "type": "SNAPSHOT",
+        "seq": flight_event_log.current_seq(flight_id),
+        **seat_codec.encode_seat_map(inventory, seats, include_layout=False)
+    }
+    if flight_state_manager.is_flight_active(flight_id):
+        total_hours = flight_state_manager.get_hours_remaining(flight_id)
+        snapshot["days_until_departure"] = total_hours // 24
+        snapshot["hours"] = total_hours % 24
+    return snapshot
+
+def build_command_reply(command: Command, result: CommandResult) -> Optional[dict]:
+    """The message telling a client how its command went, if it needs one"""
+    if isinstance(command, PurchaseCommand):
+        reply = {"type": "PURCHASE_RESULT", "seat_id": command.seat.id, "accepted": result.accepted}
+        if result.seats:
+            # The seat as sold, with the price the server set
+            reply["seat"] = result.seats[0]
+    elif isinstance(command, GroupPurchaseCommand):
+        if result.accepted:
+            reply = {"type": "GROUP_PURCHASE", "seats": result.seats}
+        else:
+            reply = {"type": "GROUP_PURCHASE_FAILED", "size": command.size, "class_type": command.class_type}
+    elif isinstance(command, HoldCommand) and not result.accepted:
+        # A successful hold is confirmed by the SEAT_HELD broadcast
+        reply = {"type": "SEAT_HOLD_FAILED", "seat_id": command.seat.id}
+    else:
+        return None
+    if result.reason:
+        reply["reason"] = result.reason
+    if command.idempotency_key:
+        reply["idempotency_key"] = command.idempotency_key
+    return reply
 
 @router.websocket("/ws/flight/{flight_id}")
 async def websocket_endpoint(websocket: WebSocket, flight_id: int):
@@ -102,34 +199,61 @@ async def websocket_endpoint(websocket: WebSocket, flight_id: int):
         await websocket.accept()
         print(f"WebSocket connection accepted for flight {flight_id}")
         
-        # Then connect to the manager
-        await manager.connect(websocket, flight_id)
-        print(f"WebSocket connection established for flight {flight_id}")
-        
-        # Get the days until departure from the database
-        db = SessionLocal()
+        # format=compact asks for seat updates as index deltas into the seat layout
         try:
-            # Get all seats for the flight
-            seats = db.query(Seat).filter(Seat.flight_id == flight_id).all()
-            if not seats:
+            compact = check_format(websocket.query_params.get("format")) == FORMAT_COMPACT
+        except ValueError as e:
+            await websocket.close(code=1008, reason=str(e))
+            return
+        
+        # A reconnecting client passes the last sequence number it saw
+        last_seq = websocket.query_params.get("last_seq")
+        backlog = None
+        if last_seq is not None:
+            try:
+                backlog = flight_event_log.since(flight_id, int(last_seq), compact)
+            except ValueError:
+                backlog = None
+            # A replay that would overflow the client's queue costs more than a snapshot
+            if backlog is not None and len(backlog) >= manager.queue_size:
+                backlog = None
+        
+        initial_messages = []
+        if backlog is None:
+            # New client, or its gap is older than the buffer
+            inventory = await inventory_service.get_async(flight_id, keep=inventory_service.is_live(flight_id))
+            if inventory is None:
                 print(f"No seats found for flight {flight_id}")
                 await websocket.close()
                 return
-            
-            days_until_departure = seats[0].days_until_departure
-            
-            # Send initial time update with current values from the service
-            if flight_state_manager.is_flight_active(flight_id):
-                total_hours = flight_state_manager.get_hours_remaining(flight_id)
-                days = total_hours // 24
-                hours = total_hours % 24
-                await websocket.send_json({
-                    "type": "TIME_UPDATE",
-                    "days_until_departure": days,
-                    "hours": hours
-                })
-        finally:
-            db.close()
+            if last_seq is not None:
+                # The Seat table can lag the write buffer, so snapshots come from the inventory
+                snapshot = build_compact_snapshot(inventory) if compact else build_seat_snapshot(inventory)
+                initial_messages.append(manager.encode(snapshot))
+        else:
+            initial_messages.extend(backlog)
+            print(f"Replaying {len(backlog)} missed events for flight {flight_id}")
+        
+        # Seats held by other buyers right now (a replay already carries the hold events)
+        if backlog is None:
+            holds = hold_service.held_seats(flight_id)
+            if holds:
+                initial_messages.append(manager.encode({"type": "SEAT_HOLDS", "holds": holds}))
+        
+        # Send initial time update with current values from the service (a snapshot already carries them)
+        if last_seq is None and flight_state_manager.is_flight_active(flight_id):
+            total_hours = flight_state_manager.get_hours_remaining(flight_id)
+            initial_messages.append(manager.encode({
+                "type": "TIME_UPDATE",
+                "days_until_departure": total_hours // 24,
+                "hours": total_hours % 24,
+                "seq": flight_event_log.current_seq(flight_id)
+            }))
+        
+        # Then connect to the manager; nothing awaits between building the initial
+        # messages and registering, so no broadcast can slip in between them
+        await manager.connect(websocket, flight_id, initial_messages, compact)
+        print(f"WebSocket connection established for flight {flight_id}")
         
         # Keep the connection alive and handle messages
         while True:
@@ -137,57 +261,23 @@ async def websocket_endpoint(websocket: WebSocket, flight_id: int):
                 # Wait for messages from the client
                 data = await websocket.receive_json()
                 
-                # Handle seat updates
-                if data.get("type") == "SEAT_UPDATE":
-                    seat_data = data.get("seat", {})
-                    seat_id = seat_data.get("id")
-                    
-                    if seat_id:
-                        # Update the seat in the database
-                        db = SessionLocal()
-                        try:
-                            seat = db.query(Seat).filter(Seat.id == seat_id).first()
-                            if seat:
-                                # Update seat properties
-                                for key, value in seat_data.items():
-                                    if hasattr(seat, key):
-                                        setattr(seat, key, value)
-                                
-                                # If the seat is being purchased, record the days until departure
-                                if seat_data.get("is_occupied") and not seat.is_occupied:
-                                    # Get the current days and hours from the countdown service
-                                    if flight_id in countdown_service._hours_remaining:
-                                        total_hours = countdown_service._hours_remaining[flight_id]
-                                        days_left = total_hours // 24
-                                        # Store the days left at the time of purchase
-                                        seat.days_until_departure = days_left
-                                        print(f"Seat {seat_id} purchased with {days_left} days until departure")
-                                
-                                db.commit()
-                                
-                                # Broadcast the update to all clients
-                                await manager.broadcast_to_flight(flight_id, {
-                                    "type": "SEAT_UPDATE",
-                                    "seat": {
-                                        "id": seat.id,
-                                        "row_number": seat.row_number,
-                                        "seat_letter": seat.seat_letter,
-                                        "is_occupied": seat.is_occupied,
-                                        "class_type": seat.class_type,
-                                        "is_window": seat.is_window,
-                                        "is_aisle": seat.is_aisle,
-                                        "is_middle": seat.is_middle,
-                                        "is_extra_legroom": seat.is_extra_legroom,
-                                        "base_price": seat.base_price,
-                                        "sale_price": seat.sale_price,
-                                        "days_until_departure": seat.days_until_departure
-                                    }
-                                })
-                        finally:
-                            db.close()
+                # Validate the message into a typed command
+                try:
+                    command = parse_command(data)
+                except ValueError as e:
+                    await manager.send_personal(websocket, {"type": "COMMAND_REJECTED", "reason": str(e)})
+                    continue
+                
+                # The flight's single writer applies it; the seat map changes reach
+                # every viewer in the next frame, the outcome goes back to this client
+                result = await command_service.submit(flight_id, command, websocket)
+                reply = build_command_reply(command, result)
+                if reply:
+                    await manager.send_personal(websocket, reply)
             except WebSocketDisconnect:
                 print(f"WebSocket disconnected for flight {flight_id}")
                 manager.disconnect(websocket, flight_id)
+                await hold_service.release_holder(websocket)
                 break
             except Exception as e:
                 print(f"Error in WebSocket connection for flight {flight_id}: {e}")
@@ -207,35 +297,17 @@ def start_flight(flight_id: int, db: Session = Depends(get_db)):
     if not flight:
         raise HTTPException(status_code=404, detail="Flight not found")
     
-    # Get seats for the flight
-    seats = db.query(Seat).filter(Seat.flight_id == flight_id).all()
-    if not seats:
+    # Days left on the countdown, if the flight is still for sale
+    row = db.execute(booking_window_query().where(Flight.id == flight_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="No seats found for this flight")
-    
-    # Get days until departure from the first seat
-    days_until_departure = seats[0].days_until_departure
+    days_until_departure = row[2]
     
     # Start the countdown timer
     countdown_service.start_timer(flight_id, days_until_departure * 24)  # Convert days to hours
     
-    # Convert seats to dictionary format for bot service
-    seat_dicts = [{
-        'id': seat.id,
-        'row_number': seat.row_number,
-        'seat_letter': seat.seat_letter,
-        'is_occupied': seat.is_occupied,
-        'class_type': seat.class_type,
-        'is_window': seat.is_window,
-        'is_aisle': seat.is_aisle,
-        'is_middle': seat.is_middle,
-        'is_extra_legroom': seat.is_extra_legroom,
-        'base_price': seat.base_price,
-        'sale_price': seat.sale_price,
-        'days_until_departure': seat.days_until_departure
-    } for seat in seats]
-    
-    # Start bots for the flight
-    bot_service.start_bots(flight_id, seat_dicts)
+    # Start bots for the flight; its seats are loaded when first needed
+    bot_service.start_bots(flight_id)
     
     return {
         "message": f"Started timer and bots for flight {flight.flight_number}",
@@ -267,6 +339,19 @@ def get_purchase_history(db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/flights/{flight_id}/purchases", response_model=dict)
+def get_live_purchases(flight_id: int):
+    """Purchases so far for a flight, per class and per day, from the in-memory counters"""
+    purchases = purchase_history_service.get_live_purchases(flight_id)
+    if purchases is None:
+        raise HTTPException(status_code=404, detail="No seats found for this flight")
+    return purchases
+
+@router.get("/flights/{flight_id}/revenue", response_model=dict)
+async def get_flight_revenue(flight_id: int):
+    """Revenue and seats sold so far, per class and buyer type, from the purchase event stream"""
+    return await purchase_event_service.aggregator.summary(flight_id)
+
 @router.get("/flights/{flight_id}/demand-forecast")
 async def get_demand_forecast(flight_id: int, db: Session = Depends(get_db)):
     """Get demand forecast for a flight from the ML service"""
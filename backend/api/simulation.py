@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from backend.config.config import settings
+from backend.db.database import get_database_stats
+from backend.services.simulation_engine import simulation_engine
+from backend.services.departure_service import departure_service
+from backend.services.command_service import command_service
+from backend.services.purchase_event_service import purchase_event_service
+from backend.services.seat_write_buffer import seat_write_buffer
+from backend.services.retention_service import retention_service
+from backend.services.memory_service import memory_service
+from backend.services.sim_clock import create_clock
+
+router = APIRouter()
+
+@router.get("/simulation/stats", response_model=dict)
+def get_simulation_stats():
+    """Per-tick timing and load of the simulation engine"""
+    return simulation_engine.get_stats()
+
+@router.get("/simulation/departures", response_model=dict)
+def get_departure_stats():
+    """Departure pipeline queue depth and per-stage latency"""
+    return departure_service.get_stats()
+
+@router.get("/simulation/commands", response_model=dict)
+def get_command_stats():
+    """Per-flight client command queues: backlog, group commit sizes and duplicates dropped"""
+    return command_service.get_stats()
+
+@router.get("/simulation/persistence", response_model=dict)
+def get_persistence_stats():
+    """Backlog and flush timing of the batched seat and purchase event writes"""
+    return {
+        "seat_writes": seat_write_buffer.get_stats(),
+        "purchase_events": purchase_event_service.get_stats()
+    }
+
+@router.get("/simulation/database", response_model=dict)
+def get_database_metrics():
+    """Connection pool use (checked out, overflow, checkout waits) and per-query timing"""
+    return get_database_stats()
+
+@router.get("/simulation/retention", response_model=dict)
+def get_retention_stats():
+    """Hot table sizes, archived flights and what the retention passes removed"""
+    return retention_service.get_stats()
+
+@router.post("/simulation/retention", response_model=dict)
+def run_retention():
+    """Run a retention pass now"""
+    return retention_service.enforce()
+
+@router.get("/simulation/memory", response_model=dict)
+def get_memory_stats():
+    """Process memory and what each subsystem keeps per flight"""
+    return memory_service.get_stats()
+
+@router.post("/simulation/clock", response_model=dict)
+async def set_simulation_clock(mode: str, acceleration: Optional[float] = None):
+    """
+    Switch the simulation clock: realtime (optionally with a new acceleration),
+    fast_forward (no sleeping) or manual (advanced with POST /simulation/step).
+    """
+    try:
+        clock = create_clock(mode, acceleration, start_hours=simulation_engine.clock.now())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    simulation_engine.set_clock(clock)
+    return clock.describe()
+
+@router.post("/simulation/step", response_model=dict)
+async def step_simulation(hours: float = settings.SIMULATION_HOURS_PER_TICK):
+    """Advance a manual simulation clock by a number of simulated hours"""
+    try:
+        await simulation_engine.advance(hours)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return simulation_engine.clock.describe()
@@ -1,15 +1,178 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from backend.config.config import settings
+from backend.utils.metrics import LatencyStats
+
+# Async drivers used for the same database as the sync engine
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """The async-driver form of a database URL, e.g. postgresql:// -> postgresql+asyncpg://"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+class PoolWaitMixin:
+    """Times every connection checkout, including waits for a connection to be returned"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = LatencyStats()
+        self.timeouts = 0
+        self._stats_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self.wait_stats.record(time.perf_counter() - started)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "size": self.size(),
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                "overflow": max(0, self.overflow()),
+                "max_overflow": self._max_overflow,
+                "timeouts": self.timeouts,
+                "checkout_wait": self.wait_stats.to_dict()
+            }
+
+class InstrumentedQueuePool(PoolWaitMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(PoolWaitMixin, AsyncAdaptedQueuePool):
+    pass
+
+class QueryStats:
+    """Per-engine query timing, by statement kind, plus the most recent slow queries"""
+
+    def __init__(self, slow_query_ms: float):
+        self.slow_query_ms = slow_query_ms
+        self.by_kind: Dict[str, LatencyStats] = {}
+        self.slow_queries = deque(maxlen=20)
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float, executemany: bool):
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        with self._lock:
+            stats = self.by_kind.get(kind)
+            if stats is None:
+                stats = self.by_kind[kind] = LatencyStats()
+            stats.record(seconds)
+            if seconds * 1000 >= self.slow_query_ms:
+                self.slow_queries.append({
+                    "ms": round(seconds * 1000, 3),
+                    "executemany": executemany,
+                    "statement": statement[:500]
+                })
 
-engine = create_engine(settings.DATABASE_URL)
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "by_kind": {kind: stats.to_dict() for kind, stats in self.by_kind.items()},
+                "slow_query_ms": self.slow_query_ms,
+                "slow_queries": list(self.slow_queries)
+            }
+
+def instrument_queries(sync_engine: Engine) -> QueryStats:
+    """Time every statement the engine runs"""
+    stats = QueryStats(settings.DB_SLOW_QUERY_MS)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        stats.record(statement, time.perf_counter() - started, executemany)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _drop_timer(context):
+        # A failed statement never reaches after_cursor_execute
+        started = context.connection.info.get("query_started") if context.connection else None
+        if started:
+            started.pop()
+
+    return stats
+
+def engine_options(url: str, async_driver: bool = False) -> dict:
+    """Pool and connection settings for an engine on the given URL"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # An in-memory database lives in one connection; keep SQLAlchemy's own pool for it
+        return {}
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if async_driver else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if parsed.get_backend_name() == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        if async_driver:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+# Sync engine, for request handlers run in the thread pool, worker threads and scripts
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine, for code running on the event loop
+ASYNC_URL = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_URL, **engine_options(ASYNC_URL, async_driver=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+query_stats = {
+    "sync": instrument_queries(engine),
+    "async": instrument_queries(async_engine.sync_engine),
+}
+
+def get_database_stats() -> dict:
+    """Live pool use and query timing of both engines"""
+    pools = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        # The pool is replaced on dispose(); read whichever one is current
+        pools[name] = pool.get_stats() if isinstance(pool, PoolWaitMixin) else {"status": pool.status()}
+    return {
+        "pools": pools,
+        "queries": {name: stats.to_dict() for name, stats in query_stats.items()}
+    }
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async DB session, for async def endpoints
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
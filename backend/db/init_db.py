@@ -11,6 +11,8 @@ from backend.models.base import Base
 from backend.models.flight import Flight
 from backend.models.seat import Seat
 from backend.models.purchase_history import PurchaseHistory
+from backend.models.purchase_event import PurchaseEvent
+from backend.models.flight_archive import FlightArchive
 from backend.utils.constants import create_seats
 
 def init_db():
@@ -1,16 +1,27 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from typing import Dict
 
 from backend.config.config import settings
-from backend.db.database import engine, SessionLocal
+from backend.db.database import engine, AsyncSessionLocal
 from backend.models.base import Base
 from backend.models.flight import Flight
-from backend.models.seat import Seat
-from backend.api import flights
+from backend.api import flights, simulation
 from backend.services.bot_service import bot_service
-from backend.services.countdown_service import countdown_service
+from backend.services.countdown_service import countdown_service, booking_window_query, still_for_sale
+from backend.services.checkpoint_service import checkpoint_service
+from backend.services.inventory_service import inventory_service
+from backend.services.simulation_engine import simulation_engine
+from backend.services.departure_service import departure_service
+from backend.services.purchase_event_service import purchase_event_service
+from backend.services.seat_write_buffer import seat_write_buffer
+from backend.services.hold_service import hold_service
+from backend.services.command_service import command_service
+from backend.services.retention_service import retention_service
+from backend.websocket.frame_aggregator import frame_aggregator
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -32,6 +43,7 @@ app.add_middleware(
 
 # Include API routes
 app.include_router(flights.router, prefix=settings.API_V1_STR)
+app.include_router(simulation.router, prefix=settings.API_V1_STR)
 
 @app.get("/")
 async def root():
@@ -39,54 +51,73 @@ async def root():
 
 @app.on_event("startup")
 async def startup_event():
-    """Start bots and countdown timers for all flights on application startup"""
-    db = SessionLocal()
-    try:
-        # Get all flights
-        flights = db.query(Flight).all()
-        
-        for flight in flights:
-            # Get seats for the flight
-            seats = db.query(Seat).filter(Seat.flight_id == flight.id).all()
-            
-            if seats:
-                # Start countdown timer for the flight
-                days_until_departure = seats[0].days_until_departure
-                countdown_service.start_timer(flight.id, days_until_departure * 24)  # Convert days to hours
-                
-                # Convert seats to dictionary format for bot service
-                seat_dicts = [{
-                    'id': seat.id,
-                    'row_number': seat.row_number,
-                    'seat_letter': seat.seat_letter,
-                    'is_occupied': seat.is_occupied,
-                    'class_type': seat.class_type,
-                    'is_window': seat.is_window,
-                    'is_aisle': seat.is_aisle,
-                    'is_middle': seat.is_middle,
-                    'is_extra_legroom': seat.is_extra_legroom,
-                    'base_price': seat.base_price,
-                    'sale_price': seat.sale_price,
-                    'days_until_departure': seat.days_until_departure
-                } for seat in seats]
-                
-                # Start bots for the flight
-                bot_service.start_bots(flight.id, seat_dicts)
-                print(f"Started bots and countdown timer for flight {flight.id}")
-    finally:
-        db.close()
+    """Resume the countdown and bots of every flight still for sale"""
+    checkpoint = checkpoint_service.load()
+    restored: Dict[int, dict] = {}
+    missing = None
+    async with AsyncSessionLocal() as db:
+        if checkpoint is not None:
+            # The checkpoint has the clock and countdowns; the database says which
+            # of its flights are still for sale, and that they are the same flights
+            live_flights = {
+                flight_id: identity
+                for flight_id, *identity in await db.execute(
+                    select(Flight.id, Flight.flight_number, Flight.departure_date, Flight.created_at)
+                    .where(still_for_sale())
+                )
+            }
+            restored = checkpoint_service.restore(checkpoint, live_flights)
+            missing = set(live_flights) - set(restored)
+        # Flights the checkpoint doesn't know (all of them, without one) come from
+        # one aggregated query; departed flights are never loaded
+        flights = [] if missing == set() else (await db.execute(booking_window_query(missing))).all()
+    
+    for flight_id, flight in restored.items():
+        if flight["timer"]:
+            countdown_service.start_timer(flight_id, flight["hours_remaining"])
+        if flight["bots"]:
+            bot_service.start_bots(flight_id)
+    for flight_id, flight_number, days_until_departure in flights:
+        countdown_service.start_timer(flight_id, days_until_departure * 24)  # Convert days to hours
+        # Seats are loaded into the inventory the first time the bots or a buyer need them
+        bot_service.start_bots(flight_id)
+    print(f"Resumed {len(restored)} flights from the checkpoint and {len(flights)} from the database")
+    
+    # Snapshot the simulation state from now on
+    checkpoint_service.start()
+    
+    # Keep the in-memory seat inventory in step with the Seat table
+    inventory_service.start_reconciliation()
+    
+    # Write bot purchases and purchase events in batches
+    seat_write_buffer.start()
+    purchase_event_service.start()
+    
+    # Compact and prune departed flights
+    retention_service.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Stop all bots and countdown timers on application shutdown"""
-    # Get all flight IDs from the database
-    db = SessionLocal()
-    try:
-        flights = db.query(Flight).all()
-        for flight in flights:
-            # Stop bots and countdown timer
-            bot_service.stop_bots(flight.id)
-            countdown_service.stop_timer(flight.id)
-            print(f"Stopped bots and countdown timer for flight {flight.id}")
-    finally:
-        db.close() 
\ No newline at end of file
+    # Freeze the simulation and write its final checkpoint while every flight is still registered
+    await simulation_engine.stop()
+    await checkpoint_service.stop()
+    
+    for flight_id in simulation_engine.flight_ids():
+        # Stop bots and countdown timer
+        bot_service.stop_bots(flight_id)
+        countdown_service.stop_timer(flight_id)
+        print(f"Stopped bots and countdown timer for flight {flight_id}")
+
+    await departure_service.stop()
+    await command_service.stop()
+    await hold_service.stop()
+    inventory_service.stop_reconciliation()
+    retention_service.stop()
+    
+    # Write sold seats and purchase events still in the buffers
+    await seat_write_buffer.stop()
+    await purchase_event_service.stop()
+    
+    # Send any updates still waiting for the next frame
+    await frame_aggregator.stop() 
\ No newline at end of file
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
+from backend.models.base import BaseModel
+
+class FlightArchive(BaseModel):
+    """Compacted seat map of a departed flight; replaces its rows in the seats table"""
+    __tablename__ = "flight_archives"
+
+    flight_id = Column(Integer, unique=True, nullable=False)  # No foreign key: the flight row may be pruned later
+    flight_number = Column(String, index=True)
+    departure_date = Column(DateTime, nullable=False, index=True)
+    seat_count = Column(Integer, nullable=False)
+    sold_count = Column(Integer, nullable=False)
+    revenue = Column(Float, nullable=False)
+    classes = Column(JSON)  # Per class: seats, sold and revenue
+    sales = Column(JSON)  # Sold seats as [row_number, seat_letter, class_type, sale_price, days_until_departure]
+
+    def __repr__(self):
+        return f"<FlightArchive(flight={self.flight_number}, sold={self.sold_count}/{self.seat_count}, departure={self.departure_date})"
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
+from backend.models.base import BaseModel
+
+class PurchaseEvent(BaseModel):
+    """Append-only record of one seat purchase; rows are never updated"""
+    __tablename__ = "purchase_events"
+
+    flight_id = Column(Integer, ForeignKey("flights.id"), nullable=False)
+    seat_id = Column(Integer, nullable=False)
+    class_type = Column(String, nullable=False)  # first, business, or economy
+    price = Column(Float, nullable=False)
+    days_until_departure = Column(Integer)
+    simulated_hours = Column(Float, nullable=False)  # Simulation clock when the purchase committed
+    buyer_type = Column(String(8), nullable=False)  # bot or human
+
+    __table_args__ = (
+        # Per-flight reads in the order the events happened
+        Index('ix_purchase_events_flight_id_id', 'flight_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<PurchaseEvent(flight={self.flight_id}, seat={self.seat_id}, price={self.price}, buyer={self.buyer_type})"
@@ -1,19 +1,25 @@
-import asyncio
 import random
 from typing import Dict, List, Set, Optional
-from datetime import datetime, timedelta
+import numpy as np
 
-from backend.db.database import SessionLocal
-from backend.models.seat import Seat
-from backend.websocket.ws_manager import manager
+from backend.websocket.frame_aggregator import frame_aggregator
 from backend.utils.constants import flight_state_manager
+from backend.services.inventory_service import inventory_service
+from backend.services.purchase_event_service import purchase_event_service, BUYER_BOT
+from backend.services.seat_write_buffer import seat_write_buffer
+from backend.services.seat_scoring import select_seats
+from backend.services.pricing import calculate_sale_price
+from backend.services.simulation_engine import simulation_engine
 
 class BotService:
     """Service to manage bots that simulate seat purchases"""
     
-    def __init__(self):
-        self._bot_tasks: Dict[int, asyncio.Task] = {}
+    def __init__(self, seed: int = None):
+        self._base_rate = 1.5  # Base purchase rate (purchases per day)
         self._active_bots: Dict[int, Set[int]] = {}  # flight_id -> set of seat_ids
+        # A seed makes the bots' decisions reproducible (e.g. for offline simulation)
+        self._rng = random.Random(seed)  # Purchase decisions and adjacent seats
+        self._np_rng = np.random.default_rng(seed)  # Random draws for vectorized seat scoring
         self._preferences = {
             'window_preference': 0.4,  # 40% of bots prefer window seats
             'aisle_preference': 0.4,   # 40% of bots prefer aisle seats
@@ -27,90 +33,98 @@ class BotService:
             'adjacent_seat_chance': 0.5  # 50% chance to buy an adjacent seat
         }
     
-    def start_bots(self, flight_id: int, available_seats: List[dict]):
-        """Start bots for a flight"""
-        if flight_id in self._bot_tasks:
+    def start_bots(self, flight_id: int, available_seats: List[dict] = None):
+        """
+        Start bots for a flight. Without seats, the flight's inventory is
+        loaded the first time its bots (or a buyer) need it.
+        """
+        if simulation_engine.has_bots(flight_id):
             # Bots already running for this flight
             return
         
         # Initialize active bots for this flight
         self._active_bots[flight_id] = set()
         
-        # Create a task for the bots
-        self._bot_tasks[flight_id] = asyncio.create_task(
-            self._run_bots(flight_id, available_seats)
-        )
+        # Seed the shared inventory with the seats we were given if it is not loaded yet
+        if available_seats:
+            inventory_service.ensure(flight_id, available_seats)
+        
+        # The simulation engine runs the bots on each tick
+        simulation_engine.add_bots(flight_id)
         
         print(f"Bots started for flight {flight_id}")
     
+    def get_rng_state(self) -> dict:
+        """State of both bot random generators, JSON-serializable"""
+        version, internal, gauss = self._rng.getstate()
+        return {
+            "random": [version, list(internal), gauss],
+            "numpy": self._np_rng.bit_generator.state
+        }
+    
+    def set_rng_state(self, state: dict):
+        """Continue the bots' random draws from a saved get_rng_state()"""
+        version, internal, gauss = state["random"]
+        self._rng.setstate((version, tuple(internal), gauss))
+        self._np_rng.bit_generator.state = state["numpy"]
+    
     def stop_bots(self, flight_id: int):
         """Stop bots for a flight"""
-        if flight_id in self._bot_tasks:
-            self._bot_tasks[flight_id].cancel()
-            del self._bot_tasks[flight_id]
-            if flight_id in self._active_bots:
-                del self._active_bots[flight_id]
+        self._active_bots.pop(flight_id, None)
+        if simulation_engine.has_bots(flight_id):
+            simulation_engine.remove_bots(flight_id)
             print(f"Bots stopped for flight {flight_id}")
+
+    def memory_usage(self) -> dict:
+        return {
+            "flights": len(self._active_bots),
+            "seats": sum(len(seats) for seats in self._active_bots.values())
+        }
     
-    async def _run_bots(self, flight_id: int, available_seats: List[dict]):
-        """Run bots for a flight"""
-        try:
-            # Wait for the flight to be active
-            while not flight_state_manager.is_flight_active(flight_id):
-                await asyncio.sleep(.25)
-            
-            # Get the initial hours remaining
-            hours_remaining = flight_state_manager.get_hours_remaining(flight_id)
-            days_remaining = hours_remaining // 24
-            
-            # Calculate the base purchase rate (purchases per day)
-            base_rate = 1.5
-            
-            # Run until the flight departs
-            while hours_remaining > 0:
-                # Filter out seats that are already occupied by bots
-                current_available_seats = [seat for seat in available_seats 
-                                         if seat['id'] not in self._active_bots.get(flight_id, set())]
-                
-                # Calculate the current demand multiplier based on days remaining and available seats
-                demand_multiplier = self._calculate_demand_multiplier(days_remaining, current_available_seats)
-                
-                # Calculate the probability of a purchase in this hour
-                purchase_prob = (base_rate / 24) * demand_multiplier
-                
-                # Randomly decide if a bot should make a purchase
-                if random.random() < purchase_prob:
-                    # Select a seat based on preferences
-                    seat = self._select_seat(current_available_seats, flight_id)
-                    if seat:
-                        # Make the purchase
-                        await self._make_purchase(flight_id, seat)
-                
-                # Wait for the next hour (0.5 seconds in our simulation)
-                await asyncio.sleep(0.005)
-                
-                # Update hours remaining
-                hours_remaining = flight_state_manager.get_hours_remaining(flight_id)
-                days_remaining = hours_remaining // 24
-                
-                # If we've reached the end of the flight, stop
-                if hours_remaining <= 0:
-                    break
-                
-                # Periodically update available seats (every 24 hours)
-                if hours_remaining % 24 == 0:
-                    # In a real implementation, you would fetch updated seats from the database
-                    # For now, we'll just use the existing list
-                    pass
-                
-        except asyncio.CancelledError:
-            # Bots were cancelled
-            print(f"Bots cancelled for flight {flight_id}")
-        except Exception as e:
-            print(f"Error in bots for flight {flight_id}: {e}")
+    async def step(self, flight_id: int) -> bool:
+        """
+        Run one bot purchase decision for a flight.
+        Returns False once the flight has departed and its bots are done.
+        """
+        # Wait for the flight to be active
+        if not flight_state_manager.is_flight_active(flight_id):
+            return flight_id not in flight_state_manager.flight_states or \
+                flight_state_manager.get_hours_remaining(flight_id) > 0
+        
+        hours_remaining = flight_state_manager.get_hours_remaining(flight_id)
+        if hours_remaining <= 0:
+            # The flight has departed
+            return False
+        days_remaining = hours_remaining // 24
+        
+        # Seats still for sale, shared with human purchases
+        inventory = await inventory_service.get_async(flight_id)
+        if inventory is None:
+            print(f"No seats found for flight {flight_id}")
+            return False
+        
+        seat = self._choose_purchase(flight_id, days_remaining, inventory.available_by_class)
+        if seat:
+            # Make the purchase
+            await self._make_purchase(flight_id, seat)
+        return True
+    
+    def _choose_purchase(self, flight_id: int, days_remaining: int, available_by_class: Dict[str, int]) -> Optional[dict]:
+        """One bot purchase decision: the seat a bot sets out to buy, or None if no bot buys"""
+        # Calculate the current demand multiplier based on days remaining and available seats
+        demand_multiplier = self._calculate_demand_multiplier(days_remaining, available_by_class)
+        
+        # Calculate the probability of a purchase in this hour
+        purchase_prob = (self._base_rate / 24) * demand_multiplier
+        
+        # Randomly decide if a bot should make a purchase
+        if self._rng.random() < purchase_prob:
+            # Select a seat based on preferences
+            return self._select_seat(flight_id)
+        return None
     
-    def _calculate_demand_multiplier(self, days_remaining: int, available_seats: List[dict] = None) -> float:
-        """Calculate the demand multiplier based on days remaining and available seats"""
+    def _calculate_demand_multiplier(self, days_remaining: int, available_by_class: Dict[str, int] = None) -> float:
+        """Calculate the demand multiplier based on days remaining and available seat counts per class"""
         # Peak at 60 days before departure
         peak1_days = 60
         
@@ -141,11 +155,11 @@ class BotService:
             time_multiplier = max(multiplier1, multiplier2)
         
         # Add scarcity factor based on available seats if provided
-        if available_seats:
+        if available_by_class and sum(available_by_class.values()) > 0:
             # Count seats by class
-            first_class_seats = sum(1 for s in available_seats if s['class_type'] == 'First Class')
-            business_class_seats = sum(1 for s in available_seats if s['class_type'] == 'Business Class')
-            economy_class_seats = sum(1 for s in available_seats if s['class_type'] == 'Economy Class')
+            first_class_seats = available_by_class.get('First Class', 0)
+            business_class_seats = available_by_class.get('Business Class', 0)
+            economy_class_seats = available_by_class.get('Economy Class', 0)
             
             # Calculate scarcity multiplier (fewer seats = higher demand)
             # We'll use a simple formula: 1 + (1 / (1 + count/10))
@@ -171,236 +185,110 @@ class BotService:
         # If no available seats provided, just return the time multiplier
         return time_multiplier
     
-    def _select_seat(self, available_seats: List[dict], flight_id: int) -> Optional[dict]:
+    def _select_seat(self, flight_id: int) -> Optional[dict]:
         """Select a seat based on bot preferences"""
-        # Filter out seats that are already occupied by bots
-        available_seats = [seat for seat in available_seats 
-                          if seat['id'] not in self._active_bots.get(flight_id, set())]
-        
-        if not available_seats:
-            return None
-        
-        # Apply preferences to score each seat
-        scored_seats = []
-        for seat in available_seats:
-            score = 0
-            
-            # Window preference
-            if seat['is_window'] and random.random() < self._preferences['window_preference']:
-                score += 3
-            
-            # Aisle preference
-            if seat['is_aisle'] and random.random() < self._preferences['aisle_preference']:
-                score += 2
-            
-            # Class preference
-            class_pref = self._preferences['class_preference'].get(seat['class_type'], 0)
-            score += class_pref * 15
-            
-            # Extra legroom preference
-            if seat['is_extra_legroom'] and random.random() < self._preferences['extra_legroom_preference']:
-                score += 2
-            
-            # Price sensitivity (lower price = higher score)
-            price_sensitivity = self._preferences['price_sensitivity']
-            max_price = max(s['base_price'] for s in available_seats)
-            min_price = min(s['base_price'] for s in available_seats)
-            if max_price > min_price:
-                price_score = 1 - ((seat['base_price'] - min_price) / (max_price - min_price))
-                score += price_score * price_sensitivity * 3
-            
-            # Add some randomness
-            score += random.random() * 2
-            
-            scored_seats.append((seat, score))
-        
-        # Sort by score (highest first)
-        scored_seats.sort(key=lambda x: x[1], reverse=True)
-        
-        # Select from the top 3 seats with probability weighted by score
-        top_seats = scored_seats[:3]
-        total_score = sum(score for _, score in top_seats)
-        
-        if total_score == 0:
-            # Fallback to random selection
-            return random.choice(available_seats)
-        
-        # Select based on score
-        r = random.random() * total_score
-        cumulative_score = 0
-        for seat, score in top_seats:
-            cumulative_score += score
-            if r <= cumulative_score:
-                return seat
-        
-        # Fallback
-        return top_seats[0][0]
+        seats = self._select_seats(flight_id, 1)
+        return seats[0] if seats else None
     
-    def _find_adjacent_seat(self, seat: dict, available_seats: List[dict], flight_id: int) -> Optional[dict]:
-        """Find an adjacent seat within the same side of the plane"""
-        # Get the row and seat letter of the current seat
-        row = seat['row_number']
-        seat_letter = seat['seat_letter']
+    def _select_seats(self, flight_id: int, count: int) -> List[dict]:
+        """
+        Make several independent bot seat choices in one vectorized call.
+        Choices may repeat a seat; whoever reserves it first gets it.
+        """
+        inventory = inventory_service.get(flight_id)
+        if inventory is None:
+            return []
         
-        # Determine which side of the plane the seat is on
-        # Left side: A, B, C
-        # Right side: D, E, F
-        is_left_side = seat_letter in ['A', 'B', 'C']
-        
-        # Find potential adjacent seats based on the side
-        potential_adjacent_letters = []
-        if is_left_side:
-            if seat_letter == 'A':
-                potential_adjacent_letters = ['B']
-            elif seat_letter == 'B':
-                potential_adjacent_letters = ['A', 'C']
-            elif seat_letter == 'C':
-                potential_adjacent_letters = ['B']
-        else:  # Right side
-            if seat_letter == 'D':
-                potential_adjacent_letters = ['E']
-            elif seat_letter == 'E':
-                potential_adjacent_letters = ['D', 'F']
-            elif seat_letter == 'F':
-                potential_adjacent_letters = ['E']
+        indices = select_seats(inventory.table, self._preferences, self._np_rng, count)
+        return [inventory.ordered_seats[i] for i in indices if i is not None]
+    
+    def _find_adjacent_seat(self, seat: dict, flight_id: int) -> Optional[dict]:
+        """Find a free seat beside this one, on the same side of the plane (A-C or D-F)"""
+        inventory = inventory_service.get(flight_id)
+        if inventory is None:
+            return None
         
-        # Find available adjacent seats
-        adjacent_seats = []
-        for letter in potential_adjacent_letters:
-            for available_seat in available_seats:
-                if (available_seat['row_number'] == row and 
-                    available_seat['seat_letter'] == letter and
-                    available_seat['id'] not in self._active_bots.get(flight_id, set())):
-                    adjacent_seats.append(available_seat)
+        adjacent_ids = inventory.grid.free_neighbours(seat['id'])
         
         # Return a random adjacent seat if any are available
-        if adjacent_seats:
-            return random.choice(adjacent_seats)
+        if adjacent_ids:
+            return inventory.get_seat(self._rng.choice(adjacent_ids))
         
         return None
     
+    def _reserve_group(self, flight_id: int, seat: dict) -> List[dict]:
+        """
+        Reserve a seat, sometimes together with the seats beside it.
+        Returns the reserved seats, or [] if someone else bought the seat first.
+        """
+        inventory = inventory_service.get(flight_id)
+        if inventory is None or not inventory.reserve(seat['id']):
+            return []
+        group = [seat]
+        
+        # 50% chance to buy an adjacent seat, and again from each seat added
+        while self._rng.random() < self._preferences['adjacent_seat_chance']:
+            # Find an adjacent seat that is still for sale
+            adjacent_seat = self._find_adjacent_seat(group[-1], flight_id)
+            if not adjacent_seat or not inventory.reserve(adjacent_seat['id']):
+                break
+            group.append(adjacent_seat)
+        return group
+    
     async def _make_purchase(self, flight_id: int, seat: dict):
-        """Make a purchase for a seat"""
-        # Mark the seat as purchased by a bot
-        self._active_bots[flight_id].add(seat['id'])
+        """Make a purchase for a seat, sometimes together with the seats beside it"""
+        group = self._reserve_group(flight_id, seat)
+        if not group:
+            # Someone else bought the seat first
+            return
+        inventory = inventory_service.get(flight_id)
+        for adjacent_seat in group[1:]:
+            print(f"🤖 BOT ALSO PURCHASING ADJACENT SEAT: Row {adjacent_seat['row_number']}{adjacent_seat['seat_letter']}")
+        
+        # Mark the seats as purchased by a bot
+        self._active_bots.setdefault(flight_id, set()).update(s['id'] for s in group)
         
         # Get the current hours remaining
         hours_remaining = flight_state_manager.get_hours_remaining(flight_id)
         days_remaining = hours_remaining // 24
         
-        # Calculate a price based on days remaining and seat class
-        base_price = seat['base_price']
-        
-        # Apply pricing based on days remaining
-        if days_remaining <= 10:  # Last 10 days - higher prices
-            price_multiplier = 1.5
-        elif days_remaining <= 30:  # Last month - medium prices
-            price_multiplier = 1.2
-        elif days_remaining <= 60:  # Peak booking period - standard prices
-            price_multiplier = 1.0
-        else:  # Early booking - slightly lower prices
-            price_multiplier = 0.9
-        
-        # Apply class-based pricing
-        if seat['class_type'] == 'First Class':
-            class_multiplier = 3.33  # First class is 3.33x base price
-        elif seat['class_type'] == 'Business Class':
-            class_multiplier = 2.0   # Business class is 2x base price
-        else:  # Economy Class
-            class_multiplier = 1.0
-        
-        # Calculate final price
-        sale_price = base_price * price_multiplier * class_multiplier
-        
-        # Round to nearest dollar
-        sale_price = round(sale_price)
-        
-        # Enhanced console logging
-        print("\n" + "="*50)
-        print(f"🤖 BOT PURCHASE MADE")
-        print(f"Flight ID: {flight_id}")
-        print(f"Seat: Row {seat['row_number']}{seat['seat_letter']} (ID: {seat['id']})")
-        print(f"Class: {seat['class_type']}")
-        print(f"Features: {'Window ' if seat['is_window'] else ''}{'Aisle ' if seat['is_aisle'] else ''}{'Extra Legroom' if seat['is_extra_legroom'] else ''}")
-        print(f"Days until departure: {days_remaining}")
-        print(f"Pricing: Base ${base_price} × {price_multiplier:.1f} (time) × {class_multiplier:.1f} (class) = ${sale_price}")
-        print("="*50 + "\n")
+        sales = []
+        for group_seat in group:
+            # Calculate a price based on days remaining and seat class
+            base_price = group_seat['base_price']
+            sale_price, price_multiplier, class_multiplier = calculate_sale_price(group_seat, days_remaining)
+            sales.append((group_seat['id'], sale_price, days_remaining))
+            
+            # Enhanced console logging
+            print("\n" + "="*50)
+            print(f"🤖 BOT PURCHASE MADE")
+            print(f"Flight ID: {flight_id}")
+            print(f"Seat: Row {group_seat['row_number']}{group_seat['seat_letter']} (ID: {group_seat['id']})")
+            print(f"Class: {group_seat['class_type']}")
+            print(f"Features: {'Window ' if group_seat['is_window'] else ''}{'Aisle ' if group_seat['is_aisle'] else ''}{'Extra Legroom' if group_seat['is_extra_legroom'] else ''}")
+            print(f"Days until departure: {days_remaining}")
+            print(f"Pricing: Base ${base_price} × {price_multiplier:.1f} (time) × {class_multiplier:.1f} (class) = ${sale_price}")
+            print("="*50 + "\n")
         
-        # Update the database
-        db = SessionLocal()
+        # Persist the sale; the inventory already guarantees the seats are ours,
+        # so the write can be batched with other purchases
         try:
-            # Get the seat from the database
-            db_seat = db.query(Seat).filter(Seat.id == seat['id']).first()
-            if db_seat:
-                # Update the seat
-                db_seat.is_occupied = True
-                db_seat.sale_price = sale_price
-                db_seat.days_until_departure = days_remaining
-                db.commit()
-                
-                # Broadcast the update to all clients
-                try:
-                    # Send a complete seat update that matches what the frontend expects
-                    await manager.broadcast_to_flight(flight_id, {
-                        "type": "SEAT_UPDATE",
-                        "seat": {
-                            "id": db_seat.id,
-                            "row_number": db_seat.row_number,
-                            "seat_letter": db_seat.seat_letter,
-                            "is_occupied": db_seat.is_occupied,
-                            "class_type": db_seat.class_type,
-                            "is_window": db_seat.is_window,
-                            "is_aisle": db_seat.is_aisle,
-                            "is_middle": db_seat.is_middle,
-                            "is_extra_legroom": db_seat.is_extra_legroom,
-                            "base_price": db_seat.base_price,
-                            "sale_price": db_seat.sale_price,
-                            "days_until_departure": db_seat.days_until_departure
-                        }
-                    })
-                    print(f"WebSocket update sent for seat {db_seat.id}")
-                except Exception as e:
-                    print(f"Error broadcasting seat update: {e}")
-                
-                # 50% chance to buy an adjacent seat
-                if random.random() < self._preferences['adjacent_seat_chance']:
-                    # Get all available seats from the database
-                    available_seats = db.query(Seat).filter(
-                        Seat.flight_id == flight_id,
-                        Seat.is_occupied == False
-                    ).all()
-                    
-                    # Convert to dictionary format
-                    available_seats_dict = [
-                        {
-                            "id": s.id,
-                            "row_number": s.row_number,
-                            "seat_letter": s.seat_letter,
-                            "is_occupied": s.is_occupied,
-                            "class_type": s.class_type,
-                            "is_window": s.is_window,
-                            "is_aisle": s.is_aisle,
-                            "is_middle": s.is_middle,
-                            "is_extra_legroom": s.is_extra_legroom,
-                            "base_price": s.base_price,
-                            "sale_price": s.sale_price,
-                            "days_until_departure": s.days_until_departure
-                        }
-                        for s in available_seats
-                    ]
-                    
-                    # Find an adjacent seat
-                    adjacent_seat = self._find_adjacent_seat(seat, available_seats_dict, flight_id)
-                    
-                    if adjacent_seat:
-                        print(f"🤖 BOT ALSO PURCHASING ADJACENT SEAT: Row {adjacent_seat['row_number']}{adjacent_seat['seat_letter']}")
-                        # Recursively call _make_purchase for the adjacent seat
-                        await self._make_purchase(flight_id, adjacent_seat)
+            await seat_write_buffer.write_many(sales)
         except Exception as e:
             print(f"Error updating seat in database: {e}")
-            db.rollback()
-        finally:
-            db.close()
+            for seat_id, _, _ in sales:
+                inventory.release(seat_id)
+                # The flight may have been stopped or evicted while the write was awaited
+                self._active_bots.get(flight_id, set()).discard(seat_id)
+            return
+        
+        for seat_id, sale_price, days in sales:
+            sold_seat = inventory.commit(seat_id, sale_price, days)
+            await purchase_event_service.record(flight_id, sold_seat, sale_price, days, BUYER_BOT)
+            
+            # Queue the update for the next frame sent to clients
+            # Send a complete seat update that matches what the frontend expects
+            frame_aggregator.publish_seat(flight_id, dict(sold_seat))
 
 # Global instance
 bot_service = BotService() 
\ No newline at end of file
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from backend.config.config import settings
+from backend.db.database import AsyncSessionLocal
+from backend.models.flight import Flight
+from backend.utils.constants import flight_state_manager
+from backend.utils.metrics import LatencyStats
+from backend.services.sim_clock import create_clock
+from backend.services.simulation_engine import simulation_engine
+from backend.services.bot_service import bot_service
+from backend.websocket.event_log import flight_event_log
+
+CHECKPOINT_VERSION = 2
+
+class CheckpointService:
+    """
+    Periodic snapshots of the simulation's in-memory state: the clock, each
+    flight's countdown, the bots' random generators and the event counters.
+    A restart restores them from the file instead of rebuilding them from
+    seat rows, so countdowns neither rewind nor jump. The file is written
+    to a temporary name and renamed over the previous one, so a crash
+    mid-write leaves the last complete checkpoint in place. Each flight is
+    saved with its number, departure date and creation time, and only
+    restored onto the database row with the same ones, so a checkpoint
+    left over from a reset database can't drive unrelated flights that
+    reuse its ids.
+    """
+
+    def __init__(self, path: str = None, interval: float = None):
+        self.path = settings.SIMULATION_CHECKPOINT_PATH if path is None else path
+        self.interval = interval or settings.SIMULATION_CHECKPOINT_INTERVAL
+        self._task: Optional[asyncio.Task] = None
+        self.write_stats = LatencyStats()
+        self.written = 0
+        self.restored_from: Optional[float] = None  # written_at of the checkpoint restored at startup
+        self.skipped_flights = 0  # Saved flights whose id named another flight, if the checkpoint was ignored
+        # flight_id -> [flight number, departure date, created at], as saved with each flight
+        self._identities: Dict[int, List[str]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    @staticmethod
+    def identity(flight_number: str, departure_date: datetime, created_at: Optional[datetime]) -> List[str]:
+        """What tells a flight apart from a later one given the same id (e.g. after a database reset)"""
+        return [flight_number, departure_date.isoformat(), created_at.isoformat() if created_at else None]
+
+    async def _load_identities(self):
+        """Look up the identity of flights new to the engine"""
+        flight_ids = simulation_engine.flight_ids()
+        for flight_id in [flight_id for flight_id in self._identities if flight_id not in flight_ids]:
+            del self._identities[flight_id]
+        unknown = [flight_id for flight_id in flight_ids if flight_id not in self._identities]
+        if not unknown:
+            return
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(Flight.id, Flight.flight_number, Flight.departure_date, Flight.created_at)
+                .where(Flight.id.in_(unknown))
+            )
+            for flight_id, *identity in rows:
+                self._identities[flight_id] = self.identity(*identity)
+
+    def capture(self) -> dict:
+        """The current state; taken on the event loop so it is consistent"""
+        flights = {}
+        for flight_id in simulation_engine.flight_ids():
+            flights[str(flight_id)] = {
+                "identity": self._identities.get(flight_id),
+                "hours_remaining": flight_state_manager.get_hours_remaining(flight_id),
+                "timer": simulation_engine.has_timer(flight_id),
+                "bots": simulation_engine.has_bots(flight_id)
+            }
+        return {
+            "version": CHECKPOINT_VERSION,
+            "written_at": time.time(),
+            "clock_hours": simulation_engine.clock.now(),
+            "flights": flights,
+            "rng": bot_service.get_rng_state(),
+            "counters": {
+                "ticks": simulation_engine.ticks,
+                "event_seq": {str(flight_id): seq for flight_id, seq in flight_event_log.sequences().items()}
+            }
+        }
+
+    def write(self, state: dict):
+        """Write a captured state atomically; blocking"""
+        started = time.perf_counter()
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(temp_path, self.path)
+        self.write_stats.record(time.perf_counter() - started)
+        self.written += 1
+
+    async def checkpoint(self):
+        """Capture now and write off the event loop"""
+        if not self.enabled:
+            return
+        await self._load_identities()
+        state = self.capture()
+        await asyncio.get_running_loop().run_in_executor(None, self.write, state)
+
+    def load(self) -> Optional[dict]:
+        """The last checkpoint, or None if there is none or it can't be used"""
+        if not self.enabled or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable simulation checkpoint {self.path}: {e}")
+            return None
+        if state.get("version") != CHECKPOINT_VERSION:
+            print(f"Ignoring simulation checkpoint with version {state.get('version')}")
+            return None
+        return state
+
+    def restore(self, state: dict, live_flights: Dict[int, Tuple[str, datetime, datetime]]) -> Dict[int, dict]:
+        """
+        Put the clock, random generators and counters back, and return the
+        saved countdown of each flight in live_flights (those still for sale,
+        by id, with their flight number, departure date and creation time).
+        A saved flight whose identity differs from the row with its id means
+        the checkpoint was taken against another database, so nothing is
+        restored. Call before any flight is registered with the engine.
+        """
+        restored = {}
+        self.skipped_flights = 0
+        for flight_id, flight in state["flights"].items():
+            flight_id = int(flight_id)
+            if flight_id not in live_flights:
+                continue
+            identity = self.identity(*live_flights[flight_id])
+            if flight["identity"] != identity:
+                self.skipped_flights += 1
+                continue
+            restored[flight_id] = flight
+            self._identities[flight_id] = identity
+        if self.skipped_flights:
+            print(f"Ignoring simulation checkpoint: {self.skipped_flights} of its flights don't match the database")
+            self._identities.clear()
+            return {}
+
+        simulation_engine.set_clock(create_clock(start_hours=state["clock_hours"]))
+        bot_service.set_rng_state(state["rng"])
+        simulation_engine.ticks = state["counters"]["ticks"]
+        for flight_id, seq in state["counters"]["event_seq"].items():
+            flight_event_log.restore_sequence(int(flight_id), seq)
+        self.restored_from = state["written_at"]
+        return restored
+
+    def start(self):
+        """Write a checkpoint every interval seconds"""
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the checkpoint loop and write a final checkpoint"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        try:
+            await self.checkpoint()
+        except Exception as e:
+            print(f"Error writing the final simulation checkpoint: {e}")
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.checkpoint()
+                except Exception as e:
+                    print(f"Error writing simulation checkpoint: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    def get_stats(self) -> dict:
+        return {
+            "path": self.path,
+            "interval": self.interval,
+            "written": self.written,
+            "restored_from": self.restored_from,
+            "skipped_flights": self.skipped_flights,
+            "write_duration": self.write_stats.to_dict()
+        }
+
+# Global instance
+checkpoint_service = CheckpointService()
@@ -0,0 +1,202 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from backend.config.config import settings
+from backend.utils.constants import flight_state_manager
+from backend.services.inventory_service import inventory_service
+from backend.services.hold_service import hold_service
+from backend.services.pricing import calculate_sale_price
+from backend.services.purchase_event_service import purchase_event_service, BUYER_HUMAN
+from backend.services.seat_write_buffer import seat_write_buffer
+from backend.websocket.frame_aggregator import frame_aggregator
+from backend.websocket.commands import (
+    Command, PurchaseCommand, GroupPurchaseCommand, HoldCommand, ReleaseCommand
+)
+
+class CommandResult:
+    """Outcome of one client command"""
+
+    def __init__(self, accepted: bool, reason: str = None, seats: List[dict] = None):
+        self.accepted = accepted
+        self.reason = reason
+        self.seats = seats or []
+
+class PendingCommand:
+    def __init__(self, command: Command, client: Any, future: asyncio.Future):
+        self.command = command
+        self.client = client
+        self.future = future
+
+class FlightCommandQueue:
+    """
+    Serializes one flight's client commands through a single writer task.
+    Seats are taken in memory one command at a time, so conflicting commands
+    never race and need no row locks; the purchases of everything drained in
+    one pass are then written to the database in a single transaction.
+    """
+
+    def __init__(self, flight_id: int, batch_size: int, idempotency_keys: int):
+        self.flight_id = flight_id
+        self.batch_size = batch_size
+        self.idempotency_keys = idempotency_keys
+        self.queue: asyncio.Queue = asyncio.Queue()
+        # idempotency key -> result future, oldest first
+        self.results: "OrderedDict[str, asyncio.Future]" = OrderedDict()
+        self.task = asyncio.create_task(self._run())
+        self.batches = 0
+        self.largest_batch = 0
+        self.duplicates = 0
+
+    def submit(self, command: Command, client: Any) -> asyncio.Future:
+        key = command.idempotency_key
+        if key is not None and key in self.results:
+            # Duplicate submission: share the first result instead of applying it again
+            self.duplicates += 1
+            return self.results[key]
+        future = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self.results[key] = future
+            while len(self.results) > self.idempotency_keys:
+                self.results.popitem(last=False)
+        self.queue.put_nowait(PendingCommand(command, client, future))
+        return future
+
+    async def _run(self):
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                while len(batch) < self.batch_size and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                self.batches += 1
+                self.largest_batch = max(self.largest_batch, len(batch))
+                try:
+                    await self._apply(batch)
+                except Exception as e:
+                    print(f"Error applying commands for flight {self.flight_id}: {e}")
+                    for pending in batch:
+                        if not pending.future.done():
+                            pending.future.set_result(CommandResult(False, "Internal error"))
+        except asyncio.CancelledError:
+            pass
+
+    async def _apply(self, batch: List[PendingCommand]):
+        inventory = await inventory_service.get_async(self.flight_id)
+        if inventory is None:
+            for pending in batch:
+                pending.future.set_result(CommandResult(False, "Flight has no seats"))
+            return
+
+        # Store the days left at the time of purchase
+        days_left = flight_state_manager.get_hours_remaining(self.flight_id) // 24
+        # Purchases taken in memory, waiting for the group commit
+        taken: List[Tuple[PendingCommand, List[Tuple[int, float, int]]]] = []
+
+        for pending in batch:
+            command = pending.command
+            if isinstance(command, PurchaseCommand):
+                seat_id = command.seat.id
+                # A seat this client holds is theirs; otherwise it must still be free
+                if not (await hold_service.claim(self.flight_id, seat_id, pending.client) or inventory.reserve(seat_id)):
+                    pending.future.set_result(CommandResult(False, "Seat is not available"))
+                    continue
+                sale_price, _, _ = calculate_sale_price(inventory.get_seat(seat_id), days_left)
+                taken.append((pending, [(seat_id, sale_price, days_left)]))
+            elif isinstance(command, GroupPurchaseCommand):
+                if command.size > settings.GROUP_BOOKING_MAX_SIZE:
+                    pending.future.set_result(CommandResult(
+                        False, f"Group size must be between 1 and {settings.GROUP_BOOKING_MAX_SIZE}"
+                    ))
+                    continue
+                seats = inventory.reserve_group(command.size, command.class_type)
+                if not seats:
+                    pending.future.set_result(CommandResult(False, "Not enough seats together in this class"))
+                    continue
+                taken.append((pending, [(seat['id'], calculate_sale_price(seat, days_left)[0], days_left) for seat in seats]))
+            elif isinstance(command, HoldCommand):
+                held = await hold_service.hold(self.flight_id, command.seat.id, pending.client)
+                pending.future.set_result(CommandResult(bool(held), None if held else "Seat is not available"))
+            elif isinstance(command, ReleaseCommand):
+                released = await hold_service.release(self.flight_id, command.seat.id, pending.client)
+                pending.future.set_result(CommandResult(released, None if released else "Seat is not held by you"))
+
+        if not taken:
+            return
+
+        # Group commit: every purchase of this pass in one transaction
+        sales = [sale for _, group in taken for sale in group]
+        try:
+            await seat_write_buffer.write_many(sales, immediate=True)
+        except Exception as e:
+            print(f"Error writing purchases for flight {self.flight_id}: {e}")
+            for seat_id, _, _ in sales:
+                inventory.release(seat_id)
+            for pending, _ in taken:
+                pending.future.set_result(CommandResult(False, "Purchase could not be saved"))
+            return
+
+        for pending, group in taken:
+            sold_seats = []
+            for seat_id, sale_price, days in group:
+                seat = inventory.commit(seat_id, sale_price, days)
+                await purchase_event_service.record(self.flight_id, seat, sale_price, days, BUYER_HUMAN)
+                sold_seats.append(dict(seat))
+                # Queue the update for the next frame sent to clients
+                frame_aggregator.publish_seat(self.flight_id, dict(seat))
+            pending.future.set_result(CommandResult(True, seats=sold_seats))
+        print(f"Committed {len(sales)} seats from {len(taken)} purchases on flight {self.flight_id} "
+              f"with {days_left} days until departure")
+
+    def stop(self):
+        self.task.cancel()
+
+class CommandService:
+    """One command queue, with its own writer, per flight with connected buyers"""
+
+    def __init__(self, batch_size: int = None, idempotency_keys: int = None):
+        self.batch_size = batch_size or settings.COMMAND_BATCH_SIZE
+        self.idempotency_keys = idempotency_keys or settings.COMMAND_IDEMPOTENCY_KEYS
+        self._queues: Dict[int, FlightCommandQueue] = {}
+
+    def _queue(self, flight_id: int) -> FlightCommandQueue:
+        queue = self._queues.get(flight_id)
+        if queue is None or queue.task.done():
+            queue = self._queues[flight_id] = FlightCommandQueue(flight_id, self.batch_size, self.idempotency_keys)
+        return queue
+
+    async def submit(self, flight_id: int, command: Command, client: Any) -> CommandResult:
+        """Queue a command for the flight's writer and wait for its result"""
+        # Shielded, so a duplicate that is cancelled can't cancel the first submission
+        return await asyncio.shield(self._queue(flight_id).submit(command, client))
+
+    def evict(self, flight_id: int):
+        queue = self._queues.pop(flight_id, None)
+        if queue:
+            queue.stop()
+
+    def memory_usage(self) -> dict:
+        queues = list(self._queues.values())
+        return {
+            "flights": len(queues),
+            "queued": sum(queue.queue.qsize() for queue in queues),
+            "idempotency_keys": sum(len(queue.results) for queue in queues)
+        }
+
+    async def stop(self):
+        for flight_id in list(self._queues):
+            self.evict(flight_id)
+
+    def get_stats(self) -> dict:
+        return {
+            flight_id: {
+                "queued": queue.queue.qsize(),
+                "batches": queue.batches,
+                "largest_batch": queue.largest_batch,
+                "duplicates": queue.duplicates,
+                "idempotency_keys": len(queue.results)
+            }
+            for flight_id, queue in self._queues.items()
+        }
+
+# Global instance
+command_service = CommandService()
@@ -0,0 +1,194 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from backend.config.config import settings
+from backend.db.database import SessionLocal
+from backend.models.flight import Flight
+from backend.models.seat import Seat
+from backend.utils.constants import flight_state_manager, create_next_flight
+from backend.utils.metrics import LatencyStats
+from backend.services.purchase_history_service import purchase_history_service
+from backend.services.purchase_event_service import purchase_event_service
+from backend.services.inventory_service import seat_to_dict
+from backend.services.retention_service import retention_service
+from backend.services.memory_service import memory_service
+from backend.services.seat_write_buffer import seat_write_buffer
+from backend.websocket.ws_manager import manager
+from backend.websocket.frame_aggregator import frame_aggregator
+
+class DepartureResult:
+    """What the blocking part of a departure produced, handed back to the event loop"""
+
+    def __init__(self, flight_id: int):
+        self.flight_id = flight_id
+        self.departed_flight_number: Optional[str] = None
+        self.new_flight_id: Optional[int] = None
+        self.days_until_departure: Optional[int] = None
+        self.new_seats: List[dict] = []
+
+class DepartureService:
+    """
+    Runs flight departures off the event loop.
+    Departing flights go on a work queue served by a fixed number of workers;
+    the database-heavy stages run in a thread pool of the same size, and the
+    results come back to the loop to start the next flight and notify clients.
+    """
+
+    STAGES = ("queue_wait", "history", "compact", "next_flight", "load_seats", "start_simulation", "broadcast", "total")
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or settings.DEPARTURE_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self.stage_stats: Dict[str, LatencyStats] = {stage: LatencyStats() for stage in self.STAGES}
+        self.completed = 0
+        self.failed = 0
+        self.in_progress = 0
+
+    def _ensure_running(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="departure")
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._run_worker()))
+
+    def submit(self, flight_id: int):
+        """Queue a departed flight for processing; returns immediately"""
+        self._ensure_running()
+        self._queue.put_nowait((flight_id, time.perf_counter()))
+
+    async def _run_worker(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                flight_id, queued_at = await self._queue.get()
+                self.stage_stats["queue_wait"].record(time.perf_counter() - queued_at)
+                self.in_progress += 1
+                try:
+                    # The seats are archived from the table, so it must have every sale
+                    try:
+                        await seat_write_buffer.flush()
+                        compact = True
+                    except Exception as e:
+                        # Archiving now could lose unflushed sales; the retention pass compacts it later
+                        print(f"Error flushing seat writes before departure of flight {flight_id}: {e}")
+                        compact = False
+                    # Without a loaded inventory the history is rolled up from the stored purchase events
+                    try:
+                        await purchase_event_service.flush()
+                    except Exception as e:
+                        print(f"Error flushing purchase events before departure of flight {flight_id}: {e}")
+                    result = await loop.run_in_executor(self._executor, self._run_blocking_stages, flight_id, compact)
+                    await self._finish(result)
+                    self.completed += 1
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Error in departure for flight {flight_id}: {e}")
+                finally:
+                    self.in_progress -= 1
+                    flight_state_manager.set_flight_inactive(flight_id)
+                    try:
+                        memory_service.release(flight_id)
+                    except Exception as e:
+                        print(f"Error releasing departed flight {flight_id}: {e}")
+                    self.stage_stats["total"].record(time.perf_counter() - queued_at)
+                    self._queue.task_done()
+        except asyncio.CancelledError:
+            pass
+
+    def _timed(self, stage: str, started: float) -> float:
+        now = time.perf_counter()
+        self.stage_stats[stage].record(now - started)
+        return now
+
+    def _run_blocking_stages(self, flight_id: int, compact: bool = True) -> DepartureResult:
+        """Database work of a departure; runs in the thread pool"""
+        result = DepartureResult(flight_id)
+        started = time.perf_counter()
+
+        # Collect purchase history before the flight is retired
+        purchase_history_service.collect_and_store_purchase_data(flight_id)
+        started = self._timed("history", started)
+
+        # With its history stored, the flight's seats give way to one archive row
+        if compact:
+            try:
+                retention_service.compact_flight(flight_id)
+            except Exception as e:
+                # The retention pass picks it up later
+                print(f"Error compacting flight {flight_id}: {e}")
+        started = self._timed("compact", started)
+
+        db = SessionLocal()
+        try:
+            # Create the next flight with the incremented flight number
+            current_flight = db.query(Flight).filter(Flight.id == flight_id).first()
+            if not current_flight:
+                return result
+            result.departed_flight_number = current_flight.flight_number
+            result.new_flight_id = create_next_flight(current_flight.flight_number)
+            started = self._timed("next_flight", started)
+            if not result.new_flight_id:
+                return result
+
+            # Load the new flight's seats for its inventory and bots
+            new_seats = db.query(Seat).filter(Seat.flight_id == result.new_flight_id).all()
+            if new_seats:
+                # Get days until departure from the first seat
+                result.days_until_departure = new_seats[0].days_until_departure
+                result.new_seats = [seat_to_dict(seat) for seat in new_seats]
+            self._timed("load_seats", started)
+        finally:
+            db.close()
+        return result
+
+    async def _finish(self, result: DepartureResult):
+        """Back on the event loop: start the next flight and tell clients"""
+        if not result.new_flight_id:
+            return
+        started = time.perf_counter()
+        if result.new_seats:
+            # Imported here to avoid circular imports
+            from backend.services.countdown_service import countdown_service
+            from backend.services.bot_service import bot_service
+            countdown_service.start_timer(result.new_flight_id, result.days_until_departure * 24)  # Convert days to hours
+            bot_service.start_bots(result.new_flight_id, result.new_seats)
+            print(f"Started timer and bots for new flight {result.new_flight_id}")
+        started = self._timed("start_simulation", started)
+
+        # Send any pending frame, then broadcast flight departure and new flight creation
+        await frame_aggregator.flush_flight(result.flight_id)
+        await manager.broadcast_to_flight(result.flight_id, {
+            "type": "FLIGHT_DEPARTURE",
+            "departed_flight": result.departed_flight_number,
+            "new_flight": result.new_flight_id
+        })
+        self._timed("broadcast", started)
+        print(f"Created new flight {result.new_flight_id} after flight {result.departed_flight_number} departed")
+
+    async def stop(self):
+        """Stop the workers; departures already in the thread pool are allowed to finish"""
+        for task in self._worker_tasks:
+            task.cancel()
+        self._worker_tasks = []
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "in_progress": self.in_progress,
+            "completed": self.completed,
+            "failed": self.failed,
+            "stages": {stage: stats.to_dict() for stage, stats in self.stage_stats.items()}
+        }
+
+# Global instance
+departure_service = DepartureService()
@@ -0,0 +1,187 @@
+import asyncio
+import heapq
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.config.config import settings
+from backend.services.inventory_service import inventory_service
+from backend.websocket.ws_manager import manager
+
+class SeatHold:
+    """A seat kept for one buyer during checkout"""
+
+    def __init__(self, hold_id: int, flight_id: int, seat_id: int, holder: Any, expires_at: float):
+        self.hold_id = hold_id
+        self.flight_id = flight_id
+        self.seat_id = seat_id
+        self.holder = holder
+        self.expires_at = expires_at  # time.monotonic() deadline
+
+    def expires_in(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+class HoldService:
+    """
+    Temporary seat holds with a time to live.
+    Holds live in memory next to the flight inventory; one min-heap of
+    expiry deadlines, served by a single task, releases every flight's
+    holds when they run out.
+    """
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl or settings.SEAT_HOLD_TTL
+        self._holds: Dict[Tuple[int, int], SeatHold] = {}  # (flight_id, seat_id) -> hold
+        self._by_holder: Dict[Any, Set[Tuple[int, int]]] = {}
+        self._heap: List[Tuple[float, int, int, int]] = []  # (expires_at, hold_id, flight_id, seat_id)
+        self._counter = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.expired = 0
+
+    def get(self, flight_id: int, seat_id: int) -> Optional[SeatHold]:
+        return self._holds.get((flight_id, seat_id))
+
+    def held_seats(self, flight_id: int) -> List[dict]:
+        """Seats currently held on a flight, for clients that connect mid-checkout"""
+        return [
+            {"seat_id": hold.seat_id, "expires_in": round(hold.expires_in(), 1)}
+            for (held_flight, _), hold in self._holds.items() if held_flight == flight_id
+        ]
+
+    async def hold(self, flight_id: int, seat_id: int, holder: Any) -> Optional[SeatHold]:
+        """Hold a free seat for a buyer and tell the flight's viewers; None if the seat is not free"""
+        existing = self.get(flight_id, seat_id)
+        if existing and existing.holder == holder:
+            # Holding again extends the hold
+            await self._drop(existing)
+        inventory = await inventory_service.get_async(flight_id)
+        if inventory is None or not inventory.hold(seat_id):
+            return None
+
+        self._counter += 1
+        hold = SeatHold(self._counter, flight_id, seat_id, holder, time.monotonic() + self.ttl)
+        self._holds[(flight_id, seat_id)] = hold
+        self._by_holder.setdefault(holder, set()).add((flight_id, seat_id))
+        earliest = not self._heap or hold.expires_at < self._heap[0][0]
+        heapq.heappush(self._heap, (hold.expires_at, hold.hold_id, flight_id, seat_id))
+        self._ensure_running()
+        if earliest and self._wakeup:
+            self._wakeup.set()
+
+        await manager.broadcast_to_flight(flight_id, {
+            "type": "SEAT_HELD",
+            "seat_id": seat_id,
+            "expires_in": self.ttl
+        })
+        return hold
+
+    async def claim(self, flight_id: int, seat_id: int, holder: Any) -> bool:
+        """
+        Turn the buyer's own hold into a purchase in progress, as if the seat
+        had just been reserved. Returns False if the buyer holds no such seat.
+        """
+        hold = self.get(flight_id, seat_id)
+        if hold is None or hold.holder != holder:
+            return False
+        inventory = await inventory_service.get_async(flight_id)
+        if inventory is None or not inventory.reserve_held(seat_id):
+            return False
+        # Its heap entry is skipped when popped
+        self._forget(hold)
+        return True
+
+    async def release(self, flight_id: int, seat_id: int, holder: Any = None, reason: str = "released") -> bool:
+        """Release a hold (only the holder's own, if a holder is given) and tell viewers"""
+        hold = self.get(flight_id, seat_id)
+        if hold is None or (holder is not None and hold.holder != holder):
+            return False
+        await self._drop(hold, reason)
+        return True
+
+    async def release_holder(self, holder: Any):
+        """Release every hold of a buyer, e.g. when their connection closes"""
+        for flight_id, seat_id in list(self._by_holder.get(holder, ())):
+            await self.release(flight_id, seat_id, holder, reason="disconnected")
+
+    def evict(self, flight_id: int):
+        """Forget every hold on a flight that has departed; their heap entries are skipped"""
+        for hold in [hold for (held_flight, _), hold in self._holds.items() if held_flight == flight_id]:
+            self._forget(hold)
+
+    def _forget(self, hold: SeatHold):
+        self._holds.pop((hold.flight_id, hold.seat_id), None)
+        keys = self._by_holder.get(hold.holder)
+        if keys is not None:
+            keys.discard((hold.flight_id, hold.seat_id))
+            if not keys:
+                del self._by_holder[hold.holder]
+
+    async def _drop(self, hold: SeatHold, reason: str = None):
+        self._forget(hold)
+        # A hold is only ever taken on a loaded inventory; once evicted there is nothing to release
+        inventory = inventory_service.peek(hold.flight_id)
+        if inventory is not None:
+            inventory.release_hold(hold.seat_id)
+        if reason:
+            await manager.broadcast_to_flight(hold.flight_id, {
+                "type": "SEAT_HOLD_RELEASED",
+                "seat_id": hold.seat_id,
+                "reason": reason
+            })
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        try:
+            while True:
+                if not self._heap:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                _, hold_id, flight_id, seat_id = heapq.heappop(self._heap)
+                hold = self.get(flight_id, seat_id)
+                if hold is None or hold.hold_id != hold_id:
+                    # Claimed, released or renewed since this entry was pushed
+                    continue
+                self.expired += 1
+                try:
+                    await self._drop(hold, reason="expired")
+                except Exception as e:
+                    print(f"Error expiring hold on seat {seat_id} of flight {flight_id}: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    def memory_usage(self) -> dict:
+        return {
+            "flights": len({flight_id for flight_id, _ in self._holds}),
+            "holds": len(self._holds),
+            "holders": len(self._by_holder),
+            "scheduled": len(self._heap)
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            "ttl": self.ttl,
+            "active": len(self._holds),
+            "scheduled": len(self._heap),
+            "expired": self.expired
+        }
+
+# Global instance
+hold_service = HoldService()
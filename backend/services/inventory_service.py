@@ -0,0 +1,342 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from backend.config.config import settings
+from backend.db.database import SessionLocal, AsyncSessionLocal
+from backend.models.seat import Seat
+from backend.services.seat_grid import SeatGrid
+from backend.services.simulation_engine import simulation_engine
+from backend.services.seat_scoring import SeatTable
+
+# Seat states
+SEAT_FREE = 0
+SEAT_RESERVED = 1   # Taken by a purchase in progress, not yet committed
+SEAT_OCCUPIED = 2
+SEAT_HELD = 3       # Held for a buyer in checkout until the hold is claimed or expires
+
+def seat_to_dict(seat: Seat) -> dict:
+    """Convert a Seat row to the dictionary format used by the services and the frontend"""
+    return {
+        'id': seat.id,
+        'row_number': seat.row_number,
+        'seat_letter': seat.seat_letter,
+        'is_occupied': seat.is_occupied,
+        'class_type': seat.class_type,
+        'is_window': seat.is_window,
+        'is_aisle': seat.is_aisle,
+        'is_middle': seat.is_middle,
+        'is_extra_legroom': seat.is_extra_legroom,
+        'base_price': seat.base_price,
+        'sale_price': seat.sale_price,
+        'days_until_departure': seat.days_until_departure
+    }
+
+class FlightInventory:
+    """Authoritative in-memory seat state for one flight"""
+
+    def __init__(self, flight_id: int, seats: List[dict]):
+        self.flight_id = flight_id
+        self._lock = threading.Lock()
+        self.seats: Dict[int, dict] = {}
+        self.status: Dict[int, int] = {}
+        # Free seats in a stable order, so callers can pick from them without a scan
+        self._free: Dict[int, dict] = {}
+        self.available_by_class: Dict[str, int] = {}
+        # Purchases per class per days-until-departure, kept current on every commit
+        self.daily_purchases: Dict[str, Dict[int, int]] = {}
+        # Bumped whenever a seat's published state changes; with the load time it tags seat map snapshots
+        self.version = 0
+        self.loaded_at = time.time_ns()
+        # Seat dicts in table order, so a table index maps straight back to its seat
+        self.ordered_seats: List[dict] = [
+            dict(seat) for seat in sorted(seats, key=lambda s: (s['row_number'], s['seat_letter']))
+        ]
+        # Array view of the same seats for vectorized scoring
+        self.table = SeatTable(self.ordered_seats)
+        # (row, letter) view of the same seats for neighbour and block lookups
+        self.grid = SeatGrid(self.ordered_seats)
+        for seat in self.ordered_seats:
+            self.seats[seat['id']] = seat
+            self.available_by_class.setdefault(seat['class_type'], 0)
+            self.daily_purchases.setdefault(seat['class_type'], defaultdict(int))
+            if seat['is_occupied']:
+                self.status[seat['id']] = SEAT_OCCUPIED
+                self._count_purchase(seat)
+            else:
+                self.status[seat['id']] = SEAT_FREE
+                self._free[seat['id']] = seat
+                self.available_by_class[seat['class_type']] += 1
+
+    def is_available(self, seat_id: int) -> bool:
+        return self.status.get(seat_id) == SEAT_FREE
+
+    def available_count(self, class_type: str = None) -> int:
+        if class_type is None:
+            return len(self._free)
+        return self.available_by_class.get(class_type, 0)
+
+    def available_seats(self) -> List[dict]:
+        """Seats that are neither reserved nor occupied"""
+        return list(self._free.values())
+
+    def get_seat(self, seat_id: int) -> Optional[dict]:
+        return self.seats.get(seat_id)
+
+    def reserve(self, seat_id: int) -> bool:
+        """Take a free seat for a purchase in progress. Returns False if it is not free."""
+        with self._lock:
+            if self.status.get(seat_id) != SEAT_FREE:
+                return False
+            self._take(seat_id, SEAT_RESERVED)
+            return True
+
+    def reserve_many(self, seat_ids: List[int]) -> bool:
+        """Take several free seats at once; takes none of them if any is not free"""
+        with self._lock:
+            if any(self.status.get(seat_id) != SEAT_FREE for seat_id in seat_ids):
+                return False
+            for seat_id in seat_ids:
+                self._take(seat_id, SEAT_RESERVED)
+            return True
+
+    def reserve_group(self, size: int, class_type: str) -> Optional[List[dict]]:
+        """Find and take free seats for a group in one cabin class, or None if it does not fit"""
+        with self._lock:
+            seat_ids = self.grid.find_group(size, class_type)
+            if not seat_ids:
+                return None
+            for seat_id in seat_ids:
+                self._take(seat_id, SEAT_RESERVED)
+            return [self.seats[seat_id] for seat_id in seat_ids]
+
+    def commit(self, seat_id: int, sale_price: float, days_until_departure: int) -> dict:
+        """Mark a reserved seat as sold and return its updated state"""
+        with self._lock:
+            if self.status.get(seat_id) == SEAT_FREE:
+                self._take(seat_id, SEAT_OCCUPIED)
+            seat = self.seats[seat_id]
+            newly_sold = not seat['is_occupied']
+            self.status[seat_id] = SEAT_OCCUPIED
+            seat['is_occupied'] = True
+            seat['sale_price'] = sale_price
+            seat['days_until_departure'] = days_until_departure
+            if newly_sold:
+                self._count_purchase(seat)
+            self.version += 1
+            return seat
+
+    def _count_purchase(self, seat: dict):
+        if seat['days_until_departure'] is None:
+            return
+        # Same day bucketing as the purchase history
+        day = min(120, max(0, seat['days_until_departure']))
+        self.daily_purchases[seat['class_type']][day] += 1
+
+    def purchase_counts(self) -> Dict[str, Dict[int, int]]:
+        """Copy of the per-class daily purchase counters, safe to read from another thread"""
+        with self._lock:
+            return {class_type: dict(days) for class_type, days in self.daily_purchases.items()}
+
+    def seat_map(self) -> Tuple[int, List[dict]]:
+        """The current version and a consistent copy of every seat, in row order"""
+        with self._lock:
+            return self.version, [dict(seat) for seat in self.ordered_seats]
+
+    def release(self, seat_id: int):
+        """Return a reserved seat to sale, e.g. when its purchase failed"""
+        with self._lock:
+            if self.status.get(seat_id) != SEAT_RESERVED:
+                return
+            self._return_to_sale(seat_id)
+
+    def hold(self, seat_id: int) -> bool:
+        """Take a free seat for a buyer in checkout. Returns False if it is not free."""
+        with self._lock:
+            if self.status.get(seat_id) != SEAT_FREE:
+                return False
+            self._take(seat_id, SEAT_HELD)
+            return True
+
+    def reserve_held(self, seat_id: int) -> bool:
+        """Turn a hold into a purchase in progress. Returns False if the seat is not held."""
+        with self._lock:
+            if self.status.get(seat_id) != SEAT_HELD:
+                return False
+            self.status[seat_id] = SEAT_RESERVED
+            return True
+
+    def release_hold(self, seat_id: int) -> bool:
+        """Return a held seat to sale. Returns False if the seat is not held."""
+        with self._lock:
+            if self.status.get(seat_id) != SEAT_HELD:
+                return False
+            self._return_to_sale(seat_id)
+            return True
+
+    def _return_to_sale(self, seat_id: int):
+        seat = self.seats[seat_id]
+        self.status[seat_id] = SEAT_FREE
+        self._free[seat_id] = seat
+        self.available_by_class[seat['class_type']] += 1
+        self.table.set_available(seat_id, True)
+        self.grid.set_available(seat_id, True)
+
+    def _take(self, seat_id: int, status: int):
+        seat = self._free.pop(seat_id)
+        self.status[seat_id] = status
+        self.available_by_class[seat['class_type']] -= 1
+        self.table.set_available(seat_id, False)
+        self.grid.set_available(seat_id, False)
+
+    def reconcile(self, occupied_rows: List[tuple]) -> int:
+        """
+        Apply seats the database has as sold but we still have as free.
+        occupied_rows are (seat_id, sale_price, days_until_departure) tuples.
+        Seats sold here but not yet in the database are left alone.
+        Returns the number of seats corrected.
+        """
+        corrected = 0
+        for seat_id, sale_price, days_until_departure in occupied_rows:
+            if self.status.get(seat_id) == SEAT_FREE:
+                self.commit(seat_id, sale_price, days_until_departure)
+                corrected += 1
+        return corrected
+
+class InventoryService:
+    """Holds the in-memory inventory of every simulated flight"""
+
+    def __init__(self):
+        self._inventories: Dict[int, FlightInventory] = {}
+        # Guards first loads, which may run on the event loop and in worker threads at once
+        self._load_lock = threading.Lock()
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def is_live(flight_id: int) -> bool:
+        """Whether a flight is still simulated, so its inventory is worth keeping once loaded"""
+        return simulation_engine.has_timer(flight_id) or simulation_engine.has_bots(flight_id)
+
+    def get(self, flight_id: int, keep: bool = True) -> Optional[FlightInventory]:
+        """
+        Get a flight's inventory, loading it from the database the first time.
+        With keep=False an inventory not loaded yet is built without being kept,
+        so reads of departed or unknown flights can't grow memory.
+        """
+        inventory = self._inventories.get(flight_id)
+        if inventory is None:
+            inventory = self.load(flight_id, keep=keep)
+        return inventory
+
+    async def get_async(self, flight_id: int, keep: bool = True) -> Optional[FlightInventory]:
+        """get() for code on the event loop: a first load uses the async engine"""
+        inventory = self._inventories.get(flight_id)
+        if inventory is None:
+            async with AsyncSessionLocal() as db:
+                rows = await db.scalars(select(Seat).where(Seat.flight_id == flight_id))
+                seats = [seat_to_dict(seat) for seat in rows]
+            # Another coroutine may have loaded it while we waited; load() keeps that one
+            inventory = self.load(flight_id, seats, keep)
+        return inventory
+
+    def load(self, flight_id: int, seats: List[dict] = None, keep: bool = True) -> Optional[FlightInventory]:
+        """
+        Build a flight's inventory from seat dicts, or from the database if none are given.
+        An inventory already loaded is kept and returned: it is authoritative, while
+        the Seat table may still lag behind sales waiting in the write buffer.
+        """
+        inventory = self._inventories.get(flight_id)
+        if inventory is not None:
+            return inventory
+        if seats is None:
+            db = SessionLocal()
+            try:
+                seats = [seat_to_dict(seat) for seat in db.query(Seat).filter(Seat.flight_id == flight_id).all()]
+            finally:
+                db.close()
+        if not seats:
+            return None
+        inventory = FlightInventory(flight_id, seats)
+        if not keep:
+            return inventory
+        with self._load_lock:
+            # Check and set, so a concurrent load can't replace an inventory already in use
+            return self._inventories.setdefault(flight_id, inventory)
+
+    def ensure(self, flight_id: int, seats: List[dict] = None) -> Optional[FlightInventory]:
+        """Get a flight's inventory, building it from the given seats if it is not loaded yet"""
+        inventory = self._inventories.get(flight_id)
+        if inventory is None:
+            inventory = self.load(flight_id, seats)
+        return inventory
+
+    def peek(self, flight_id: int) -> Optional[FlightInventory]:
+        """Get a flight's inventory only if it is already loaded"""
+        return self._inventories.get(flight_id)
+
+    def is_kept(self, inventory: FlightInventory) -> bool:
+        """Whether an inventory is the one held for its flight, rather than a throwaway copy"""
+        return self._inventories.get(inventory.flight_id) is inventory
+
+    def evict(self, flight_id: int):
+        self._inventories.pop(flight_id, None)
+
+    def memory_usage(self) -> dict:
+        inventories = list(self._inventories.values())
+        return {
+            "flights": len(inventories),
+            "seats": sum(len(inventory.ordered_seats) for inventory in inventories)
+        }
+
+    async def reconcile(self) -> int:
+        """Pull seats sold outside the inventory (e.g. by scripts) from the Seat table"""
+        if not self._inventories:
+            return 0
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(Seat.flight_id, Seat.id, Seat.sale_price, Seat.days_until_departure).where(
+                    Seat.flight_id.in_(list(self._inventories)),
+                    Seat.is_occupied == True
+                )
+            )).all()
+        by_flight: Dict[int, List[tuple]] = {}
+        for flight_id, seat_id, sale_price, days in rows:
+            by_flight.setdefault(flight_id, []).append((seat_id, sale_price, days))
+        corrected = 0
+        for flight_id, occupied_rows in by_flight.items():
+            inventory = self._inventories.get(flight_id)
+            if inventory:
+                corrected += inventory.reconcile(occupied_rows)
+        if corrected:
+            print(f"Inventory reconciliation corrected {corrected} seats")
+        return corrected
+
+    def start_reconciliation(self, interval: float = None):
+        """Periodically reconcile all loaded inventories with the Seat table"""
+        if self._reconcile_task is None or self._reconcile_task.done():
+            self._reconcile_task = asyncio.create_task(
+                self._run_reconciliation(interval or settings.INVENTORY_RECONCILE_INTERVAL)
+            )
+
+    def stop_reconciliation(self):
+        if self._reconcile_task and not self._reconcile_task.done():
+            self._reconcile_task.cancel()
+        self._reconcile_task = None
+
+    async def _run_reconciliation(self, interval: float):
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.reconcile()
+                except Exception as e:
+                    print(f"Error reconciling inventory: {e}")
+        except asyncio.CancelledError:
+            pass
+
+# Global instance
+inventory_service = InventoryService()
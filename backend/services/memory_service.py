@@ -0,0 +1,85 @@
+import os
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from backend.utils.constants import flight_state_manager
+from backend.services.simulation_engine import simulation_engine
+from backend.services.inventory_service import inventory_service
+from backend.services.purchase_event_service import purchase_event_service
+from backend.services.command_service import command_service
+from backend.services.hold_service import hold_service
+from backend.services.seat_map_cache import seat_map_cache
+from backend.websocket.event_log import flight_event_log
+from backend.websocket.frame_aggregator import frame_aggregator
+from backend.websocket.seat_codec import seat_codec
+from backend.websocket.ws_manager import manager
+
+class MemoryService:
+    """
+    Keeps per-flight state bounded by the flights still for sale.
+    Every service that keeps something per flight lets go of it when the
+    flight's departure completes, and the stats show what each one holds,
+    so anything that grows with the number of departed flights stands out.
+    """
+
+    def __init__(self):
+        self.released = 0
+
+    def release(self, flight_id: int):
+        """Drop everything kept in memory for a flight that has departed"""
+        # Imported here to avoid circular imports
+        from backend.services.bot_service import bot_service
+        bot_service.stop_bots(flight_id)
+        simulation_engine.remove_timer(flight_id)
+        flight_state_manager.remove(flight_id)
+        hold_service.evict(flight_id)
+        command_service.evict(flight_id)
+        inventory_service.evict(flight_id)
+        purchase_event_service.aggregator.evict(flight_id)
+        seat_map_cache.evict(flight_id)
+        seat_codec.evict(flight_id)
+        frame_aggregator.evict(flight_id)
+        flight_event_log.evict(flight_id)
+        self.released += 1
+
+    @staticmethod
+    def process_memory() -> dict:
+        """Resident set size now and at its peak, in bytes, where the platform reports them"""
+        usage = {"rss_bytes": None, "max_rss_bytes": None}
+        try:
+            with open("/proc/self/statm") as f:
+                usage["rss_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            pass
+        if resource is not None:
+            # Kilobytes on Linux
+            usage["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return usage
+
+    def get_stats(self) -> dict:
+        from backend.services.bot_service import bot_service
+        return {
+            "process": self.process_memory(),
+            "live_flights": len(simulation_engine.flight_ids()),
+            "released_flights": self.released,
+            "subsystems": {
+                "simulation_engine": simulation_engine.memory_usage(),
+                "flight_states": flight_state_manager.memory_usage(),
+                "bots": bot_service.memory_usage(),
+                "inventories": inventory_service.memory_usage(),
+                "revenue": purchase_event_service.aggregator.memory_usage(),
+                "commands": command_service.memory_usage(),
+                "holds": hold_service.memory_usage(),
+                "seat_map_cache": seat_map_cache.memory_usage(),
+                "seat_layouts": seat_codec.memory_usage(),
+                "frames": frame_aggregator.memory_usage(),
+                "event_log": flight_event_log.memory_usage(),
+                "connections": manager.memory_usage()
+            }
+        }
+
+# Global instance
+memory_service = MemoryService()
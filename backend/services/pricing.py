@@ -0,0 +1,31 @@
+from typing import Tuple
+
+def calculate_sale_price(seat: dict, days_remaining: int) -> Tuple[float, float, float]:
+    """
+    Price a seat for a sale with days_remaining days until departure.
+    Returns (sale_price, price_multiplier, class_multiplier); used for bot and
+    client purchases alike, so what a client pays is always set by the server.
+    """
+    base_price = seat['base_price']
+
+    # Apply pricing based on days remaining
+    if days_remaining <= 10:  # Last 10 days - higher prices
+        price_multiplier = 1.5
+    elif days_remaining <= 30:  # Last month - medium prices
+        price_multiplier = 1.2
+    elif days_remaining <= 60:  # Peak booking period - standard prices
+        price_multiplier = 1.0
+    else:  # Early booking - slightly lower prices
+        price_multiplier = 0.9
+
+    # Apply class-based pricing
+    if seat['class_type'] == 'First Class':
+        class_multiplier = 3.33  # First class is 3.33x base price
+    elif seat['class_type'] == 'Business Class':
+        class_multiplier = 2.0   # Business class is 2x base price
+    else:  # Economy Class
+        class_multiplier = 1.0
+
+    # Calculate final price, rounded to nearest dollar
+    sale_price = round(base_price * price_multiplier * class_multiplier)
+    return sale_price, price_multiplier, class_multiplier
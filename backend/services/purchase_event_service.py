@@ -0,0 +1,244 @@
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, select
+
+from backend.config.config import settings
+from backend.db.database import SessionLocal, AsyncSessionLocal
+from backend.models.purchase_event import PurchaseEvent
+from backend.services.simulation_engine import simulation_engine
+from backend.services.inventory_service import inventory_service
+
+BUYER_BOT = "bot"
+BUYER_HUMAN = "human"
+
+class FlightRevenue:
+    """Running totals of one flight's purchase events"""
+
+    def __init__(self, flight_id: int):
+        self.flight_id = flight_id
+        self.last_event_hours: Optional[float] = None
+        # Per class: sold, revenue, and sold per days-until-departure
+        self.sold: Dict[str, int] = defaultdict(int)
+        self.revenue: Dict[str, float] = defaultdict(float)
+        self.daily_purchases: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.by_buyer: Dict[str, int] = defaultdict(int)
+
+    def apply(self, event: dict):
+        class_type = event['class_type']
+        self.sold[class_type] += 1
+        self.revenue[class_type] += event['price']
+        self.by_buyer[event['buyer_type']] += 1
+        if event['days_until_departure'] is not None:
+            # Same day bucketing as the purchase history
+            day = min(120, max(0, event['days_until_departure']))
+            self.daily_purchases[class_type][day] += 1
+        self.last_event_hours = event['simulated_hours']
+
+    def to_dict(self) -> dict:
+        total_sold = sum(self.sold.values())
+        total_revenue = sum(self.revenue.values())
+        return {
+            "flight_id": self.flight_id,
+            "total_sold": total_sold,
+            "total_revenue": round(total_revenue, 2),
+            "average_price": round(total_revenue / total_sold, 2) if total_sold else 0.0,
+            "by_buyer": dict(self.by_buyer),
+            "last_event_hours": self.last_event_hours,
+            "classes": {
+                class_type: {
+                    "sold": sold,
+                    "revenue": round(self.revenue[class_type], 2),
+                    "average_price": round(self.revenue[class_type] / sold, 2) if sold else 0.0
+                }
+                for class_type, sold in self.sold.items()
+            }
+        }
+
+class PurchaseEventAggregator:
+    """
+    Rolls purchase events up into per-flight revenue and daily purchase counts
+    as they are recorded. A flight seen for the first time is seeded from its
+    stored events, so the totals survive a restart. Only flights still being
+    simulated are kept; summaries of any other flight are computed per request.
+    """
+
+    def __init__(self):
+        self._flights: Dict[int, FlightRevenue] = {}
+        self._seeding: Dict[int, asyncio.Task] = {}
+
+    async def _flight(self, flight_id: int, keep: bool = True) -> FlightRevenue:
+        revenue = self._flights.get(flight_id)
+        if revenue is None:
+            # Concurrent first events of a flight share one seeding query
+            seeding = self._seeding.get(flight_id)
+            if seeding is None:
+                seeding = self._seeding[flight_id] = asyncio.create_task(self._seed(flight_id))
+            try:
+                revenue = await seeding
+            finally:
+                self._seeding.pop(flight_id, None)
+            if keep:
+                revenue = self._flights.setdefault(flight_id, revenue)
+        return revenue
+
+    async def _seed(self, flight_id: int) -> FlightRevenue:
+        revenue = FlightRevenue(flight_id)
+        async with AsyncSessionLocal() as db:
+            rows = await db.stream(self._stored_query(flight_id))
+            async for row in rows:
+                revenue.apply(row._asdict())
+        return revenue
+
+    @staticmethod
+    def _is_live(flight_id: int) -> bool:
+        return (inventory_service.peek(flight_id) is not None
+                or simulation_engine.has_timer(flight_id) or simulation_engine.has_bots(flight_id))
+
+    async def apply(self, event: dict):
+        (await self._flight(event['flight_id'])).apply(event)
+
+    async def summary(self, flight_id: int) -> dict:
+        # Unknown and departed flights are summarized without being kept, so
+        # requests for arbitrary ids can't grow the cache
+        return (await self._flight(flight_id, keep=self._is_live(flight_id))).to_dict()
+
+    def evict(self, flight_id: int):
+        self._flights.pop(flight_id, None)
+
+    def memory_usage(self) -> dict:
+        return {"flights": len(self._flights), "seeding": len(self._seeding)}
+
+    @staticmethod
+    def _stored_query(flight_id: int):
+        return select(
+            PurchaseEvent.flight_id, PurchaseEvent.class_type, PurchaseEvent.price,
+            PurchaseEvent.days_until_departure, PurchaseEvent.simulated_hours, PurchaseEvent.buyer_type
+        ).where(PurchaseEvent.flight_id == flight_id).order_by(PurchaseEvent.id)
+
+    @staticmethod
+    def stream_stored(flight_id: int, batch_size: int = 1000):
+        """Yield a flight's stored events in the order they happened"""
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                PurchaseEventAggregator._stored_query(flight_id).execution_options(yield_per=batch_size)
+            )
+            for row in rows:
+                yield row._asdict()
+        finally:
+            db.close()
+
+class PurchaseEventService:
+    """
+    Append-only log of seat purchases.
+    Events are aggregated immediately and buffered for the database, which
+    receives them as one bulk INSERT per flush.
+    """
+
+    def __init__(self, flush_interval: float = None, batch_size: int = None):
+        self.flush_interval = flush_interval or settings.PURCHASE_EVENT_FLUSH_INTERVAL
+        self.batch_size = batch_size or settings.PURCHASE_EVENT_BATCH_SIZE
+        self.aggregator = PurchaseEventAggregator()
+        self._buffer: List[dict] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.written = 0
+        self.failed_flushes = 0
+
+    async def record(self, flight_id: int, seat: dict, price: float, days_until_departure: int, buyer_type: str):
+        """Append a committed purchase"""
+        event = {
+            'flight_id': flight_id,
+            'seat_id': seat['id'],
+            'class_type': seat['class_type'],
+            'price': float(price),
+            'days_until_departure': days_until_departure,
+            'simulated_hours': simulation_engine.clock.now(),
+            'buyer_type': buyer_type
+        }
+        # Aggregate before buffering: a flight's first event waits for the seeding
+        # query, which must not also find this event already written
+        try:
+            await self.aggregator.apply(event)
+        except Exception as e:
+            # The stored log stays complete; the flight is seeded again next time
+            print(f"Error aggregating purchase event for flight {flight_id}: {e}")
+        self._buffer.append(event)
+        if len(self._buffer) >= self.batch_size and self._wakeup:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def _take_batch(self) -> List[dict]:
+        batch, self._buffer = self._buffer, []
+        return batch
+
+    def _restore_batch(self, batch: List[dict]):
+        # Keep the failed events ahead of anything recorded since
+        self._buffer = batch + self._buffer
+
+    @staticmethod
+    async def _insert(batch: List[dict]):
+        async with AsyncSessionLocal() as db:
+            async with db.begin():
+                await db.execute(insert(PurchaseEvent), batch)
+
+    async def flush(self) -> int:
+        """Write every buffered event now; returns the number written"""
+        batch = self._take_batch()
+        if not batch:
+            return 0
+        try:
+            await self._insert(batch)
+        except Exception:
+            self._restore_batch(batch)
+            self.failed_flushes += 1
+            raise
+        self.written += len(batch)
+        return len(batch)
+
+    def start(self):
+        """Flush the buffer every flush_interval seconds, or sooner when it fills up"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Error writing purchase events on shutdown: {e}")
+
+    async def _run(self):
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"Error writing purchase events: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    def get_stats(self) -> dict:
+        return {
+            "pending": len(self._buffer),
+            "written": self.written,
+            "failed_flushes": self.failed_flushes,
+            "flush_interval": self.flush_interval,
+            "batch_size": self.batch_size
+        }
+
+# Global instance
+purchase_event_service = PurchaseEventService()
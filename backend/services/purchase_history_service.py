@@ -1,15 +1,73 @@
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 
 from backend.db.database import SessionLocal
 from backend.models.flight import Flight
 from backend.models.seat import Seat
 from backend.models.purchase_history import PurchaseHistory
+from backend.services.inventory_service import inventory_service
+from backend.services.purchase_event_service import FlightRevenue, PurchaseEventAggregator
 
 class PurchaseHistoryService:
     """Service to handle flight purchase history data collection and storage"""
     
+    @staticmethod
+    def _empty_counts() -> Dict[str, Dict[int, int]]:
+        return {
+            'first': defaultdict(int),
+            'business': defaultdict(int),
+            'economy': defaultdict(int)
+        }
+    
+    @staticmethod
+    def _count_from_seats(db: Session, flight_id: int) -> Dict[str, Dict[int, int]]:
+        """Rebuild the per-class daily counts from the flight's sold seats"""
+        class_purchases = PurchaseHistoryService._empty_counts()
+        seats = db.query(Seat.class_type, Seat.days_until_departure).filter(
+            Seat.flight_id == flight_id,
+            Seat.is_occupied == True
+        ).all()
+        for class_type, days_until_departure in seats:
+            if days_until_departure is not None:
+                # Round to nearest day
+                day = min(120, max(0, days_until_departure))
+                class_purchases[class_type][day] += 1
+        return class_purchases
+    
+    @staticmethod
+    def _count_from_events(flight_id: int) -> Optional[Dict[str, Dict[int, int]]]:
+        """Roll the flight's stored purchase events up into per-class daily counts, or None if it has none"""
+        revenue = FlightRevenue(flight_id)
+        for event in PurchaseEventAggregator.stream_stored(flight_id):
+            revenue.apply(event)
+        if not revenue.sold:
+            return None
+        class_purchases = PurchaseHistoryService._empty_counts()
+        class_purchases.update(revenue.daily_purchases)
+        return class_purchases
+    
+    @staticmethod
+    def get_live_purchases(flight_id: int) -> Optional[dict]:
+        """Purchases so far for a flight, straight from its in-memory counters"""
+        # Departed and unknown flights are counted without keeping their inventory
+        inventory = inventory_service.get(flight_id, keep=inventory_service.is_live(flight_id))
+        if inventory is None:
+            return None
+        counts = inventory.purchase_counts()
+        by_class = {}
+        for class_type, purchases in counts.items():
+            by_class[class_type] = {
+                "sold": sum(purchases.values()),
+                "available": inventory.available_count(class_type),
+                "daily_purchases": {str(day): count for day, count in sorted(purchases.items(), reverse=True)}
+            }
+        return {
+            "flight_id": flight_id,
+            "total_sold": sum(c["sold"] for c in by_class.values()),
+            "classes": by_class
+        }
+    
     @staticmethod
     def collect_and_store_purchase_data(flight_id: int):
         """
@@ -24,22 +82,17 @@ class PurchaseHistoryService:
                 print(f"Error: Flight {flight_id} not found")
                 return
             
-            # Get all seats for the flight
-            seats = db.query(Seat).filter(Seat.flight_id == flight_id).all()
-            
-            # Initialize data structures to collect purchase data by class
-            class_purchases: Dict[str, Dict[int, int]] = {
-                'first': defaultdict(int),
-                'business': defaultdict(int),
-                'economy': defaultdict(int)
-            }
-            
-            # Collect purchase data
-            for seat in seats:
-                if seat.is_occupied and seat.days_until_departure is not None:
-                    # Round to nearest day
-                    day = min(120, max(0, seat.days_until_departure))
-                    class_purchases[seat.class_type][day] += 1
+            # The flight's inventory keeps the counters current as purchases commit;
+            # if it is not loaded (e.g. after a restart) roll up the purchase events,
+            # and scan the seats only for flights that have none
+            inventory = inventory_service.peek(flight_id)
+            if inventory is not None:
+                class_purchases = PurchaseHistoryService._empty_counts()
+                class_purchases.update(inventory.purchase_counts())
+            else:
+                class_purchases = PurchaseHistoryService._count_from_events(flight_id)
+                if class_purchases is None:
+                    class_purchases = PurchaseHistoryService._count_from_seats(db, flight_id)
             
             # Create purchase history records for each class
             for class_type, purchases in class_purchases.items():
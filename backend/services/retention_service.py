@@ -0,0 +1,202 @@
+import asyncio
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, select
+
+from backend.config.config import settings
+from backend.db.database import SessionLocal
+from backend.models.flight import Flight
+from backend.models.flight_archive import FlightArchive
+from backend.models.purchase_event import PurchaseEvent
+from backend.models.purchase_history import PurchaseHistory
+from backend.models.seat import Seat
+
+class RetentionService:
+    """
+    Keeps the hot tables sized by the flights still for sale.
+    A departed flight's seats are compacted into one FlightArchive row as soon
+    as its purchase history is stored; a periodic pass compacts any flight that
+    was missed and prunes departed flights, with their purchase events, once
+    they fall outside the retention window.
+    """
+
+    def __init__(self, retention_days: int = None, interval: float = None, batch_size: int = 500):
+        self.retention_days = settings.RETENTION_DAYS if retention_days is None else retention_days
+        self.interval = interval or settings.RETENTION_INTERVAL
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self.compacted = 0
+        self.pruned_flights = 0
+        self.pruned_events = 0
+        self.last_run: Optional[dict] = None
+
+    @staticmethod
+    def _has_history(db, flight: Flight) -> bool:
+        return db.scalar(select(PurchaseHistory.id).where(
+            PurchaseHistory.flight_number == flight.flight_number,
+            PurchaseHistory.departure_date == flight.departure_date
+        ).limit(1)) is not None
+
+    def compact_flight(self, flight_id: int) -> bool:
+        """
+        Replace a departed flight's seat rows with its archive row, in one
+        transaction. Only done once the flight's purchase history is stored;
+        returns whether the flight was compacted.
+        """
+        db = SessionLocal()
+        try:
+            flight = db.get(Flight, flight_id)
+            if flight is None or not self._has_history(db, flight):
+                return False
+            seats = db.execute(
+                select(Seat.row_number, Seat.seat_letter, Seat.class_type, Seat.is_occupied,
+                       Seat.sale_price, Seat.days_until_departure)
+                .where(Seat.flight_id == flight_id)
+                .order_by(Seat.row_number, Seat.seat_letter)
+            ).all()
+            archived = db.scalar(select(FlightArchive.id).where(FlightArchive.flight_id == flight_id))
+            if archived is None:
+                db.add(self._archive(flight, seats))
+            elif not seats:
+                return False
+            db.execute(delete(Seat).where(Seat.flight_id == flight_id))
+            db.commit()
+            self.compacted += 1
+            print(f"Compacted {len(seats)} seats of departed flight {flight.flight_number}")
+            return True
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _archive(flight: Flight, seats: List[tuple]) -> FlightArchive:
+        classes: Dict[str, dict] = {}
+        sales = []
+        for row_number, seat_letter, class_type, is_occupied, sale_price, days in seats:
+            totals = classes.setdefault(class_type, {"seats": 0, "sold": 0, "revenue": 0.0})
+            totals["seats"] += 1
+            if is_occupied:
+                totals["sold"] += 1
+                totals["revenue"] += sale_price or 0.0
+                sales.append([row_number, seat_letter, class_type, sale_price, days])
+        for totals in classes.values():
+            totals["revenue"] = round(totals["revenue"], 2)
+        return FlightArchive(
+            flight_id=flight.id,
+            flight_number=flight.flight_number,
+            departure_date=flight.departure_date,
+            seat_count=len(seats),
+            sold_count=len(sales),
+            revenue=round(sum(totals["revenue"] for totals in classes.values()), 2),
+            classes=classes,
+            sales=sales
+        )
+
+    def _uncompacted_departures(self, db) -> List[int]:
+        """Flights with stored purchase history whose seats were never compacted"""
+        return list(db.scalars(
+            select(Flight.id).distinct()
+            .join(PurchaseHistory, and_(
+                PurchaseHistory.flight_number == Flight.flight_number,
+                PurchaseHistory.departure_date == Flight.departure_date
+            ))
+            .join(Seat, Seat.flight_id == Flight.id)
+        ))
+
+    def _prune(self, db) -> dict:
+        """Delete departed flights older than the window, measured back from the latest departure"""
+        latest = db.scalar(select(func.max(FlightArchive.departure_date)))
+        if latest is None or self.retention_days <= 0:
+            return {"flights": 0, "events": 0}
+        cutoff = latest - timedelta(days=self.retention_days)
+        flights = events = 0
+        while True:
+            flight_ids = list(db.scalars(
+                select(Flight.id)
+                .join(FlightArchive, FlightArchive.flight_id == Flight.id)
+                .where(Flight.departure_date < cutoff)
+                .limit(self.batch_size)
+            ))
+            if not flight_ids:
+                break
+            events += db.execute(delete(PurchaseEvent).where(PurchaseEvent.flight_id.in_(flight_ids))).rowcount
+            db.execute(delete(Seat).where(Seat.flight_id.in_(flight_ids)))
+            flights += db.execute(delete(Flight).where(Flight.id.in_(flight_ids))).rowcount
+            db.commit()
+        return {"flights": flights, "events": events, "cutoff": cutoff.isoformat()}
+
+    def enforce(self) -> dict:
+        """One retention pass; blocking, so run it off the event loop"""
+        db = SessionLocal()
+        try:
+            missed = self._uncompacted_departures(db)
+        finally:
+            db.close()
+        compacted = 0
+        for flight_id in missed:
+            try:
+                compacted += self.compact_flight(flight_id)
+            except Exception as e:
+                # e.g. its departure compacted it concurrently; the next pass retries
+                print(f"Error compacting flight {flight_id}: {e}")
+
+        db = SessionLocal()
+        try:
+            pruned = self._prune(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self.pruned_flights += pruned["flights"]
+        self.pruned_events += pruned["events"]
+        self.last_run = {"compacted": compacted, "pruned": pruned}
+        return self.last_run
+
+    def start(self):
+        """Run a retention pass every interval seconds"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    await loop.run_in_executor(None, self.enforce)
+                except Exception as e:
+                    print(f"Error enforcing retention: {e}")
+                await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            pass
+
+    def get_stats(self) -> dict:
+        db = SessionLocal()
+        try:
+            hot_seats = db.scalar(select(func.count(Seat.id)))
+            flights = db.scalar(select(func.count(Flight.id)))
+            archived = db.scalar(select(func.count(FlightArchive.id)))
+        finally:
+            db.close()
+        return {
+            "retention_days": self.retention_days,
+            "interval": self.interval,
+            "seats": hot_seats,
+            "flights": flights,
+            "archived_flights": archived,
+            "compacted": self.compacted,
+            "pruned_flights": self.pruned_flights,
+            "pruned_events": self.pruned_events,
+            "last_run": self.last_run
+        }
+
+# Global instance
+retention_service = RetentionService()
@@ -0,0 +1,133 @@
+from itertools import permutations
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Seats on each side of the aisle; adjacency and groups never cross it
+SIDES: Tuple[Tuple[str, ...], ...] = (('A', 'B', 'C'), ('D', 'E', 'F'))
+NO_SEAT = -1
+
+class SeatGrid:
+    """
+    Seat ids and occupancy of one flight as (row, letter) arrays, so
+    neighbour and block lookups are index arithmetic instead of scans.
+    Positions without a seat hold NO_SEAT and always read as taken.
+    """
+
+    def __init__(self, seats: List[dict]):
+        self.rows: List[int] = sorted({seat['row_number'] for seat in seats})
+        self.letters: List[str] = [letter for side in SIDES for letter in side]
+        self.row_index: Dict[int, int] = {row: i for i, row in enumerate(self.rows)}
+        self.letter_index: Dict[str, int] = {letter: i for i, letter in enumerate(self.letters)}
+        # Column of the first seat of each side, and the side of each column
+        self.side_starts: List[int] = []
+        self.side_of: List[int] = []
+        for side, letters in enumerate(SIDES):
+            self.side_starts.append(len(self.side_of))
+            self.side_of.extend([side] * len(letters))
+        shape = (len(self.rows), len(self.letters))
+        self.seat_ids = np.full(shape, NO_SEAT, dtype=np.int64)
+        self.free = np.zeros(shape, dtype=bool)
+        self.position: Dict[int, Tuple[int, int]] = {}
+        # Cabin class of each row
+        self.row_class: List[Optional[str]] = [None] * len(self.rows)
+        for seat in seats:
+            r = self.row_index[seat['row_number']]
+            c = self.letter_index[seat['seat_letter']]
+            self.seat_ids[r, c] = seat['id']
+            self.free[r, c] = not seat['is_occupied']
+            self.position[seat['id']] = (r, c)
+            self.row_class[r] = seat['class_type']
+        self.class_rows: Dict[str, np.ndarray] = {
+            class_type: np.array([row_class == class_type for row_class in self.row_class])
+            for class_type in set(self.row_class)
+        }
+        # Longest run of free seats in each row and side, kept current on every change
+        self.free_runs = np.zeros((len(self.rows), len(SIDES)), dtype=np.int8)
+        for r in range(len(self.rows)):
+            for side in range(len(SIDES)):
+                self._update_run(r, side)
+
+    def set_available(self, seat_id: int, available: bool):
+        r, c = self.position[seat_id]
+        self.free[r, c] = available
+        self._update_run(r, self.side_of[c])
+
+    def _update_run(self, r: int, side: int):
+        start = self.side_starts[side]
+        longest = current = 0
+        for free in self.free[r, start:start + len(SIDES[side])]:
+            current = current + 1 if free else 0
+            longest = max(longest, current)
+        self.free_runs[r, side] = longest
+
+    def _block_in_side(self, r: int, side: int, size: int) -> Optional[List[int]]:
+        start = self.side_starts[side]
+        for first in range(start, start + len(SIDES[side]) - size + 1):
+            if self.free[r, first:first + size].all():
+                return [int(seat_id) for seat_id in self.seat_ids[r, first:first + size]]
+        return None
+
+    def _sides_for(self, r: int, blocks: List[int]) -> Optional[Tuple[int, ...]]:
+        """A different side of row r for each block, each able to take its block, or None"""
+        for sides in permutations(range(len(SIDES)), len(blocks)):
+            if all(self.free_runs[r, side] >= block for side, block in zip(sides, blocks)):
+                return sides
+        return None
+
+    def find_group(self, size: int, class_type: str) -> Optional[List[int]]:
+        """
+        Free seats for a group in one cabin class, or None if it does not fit.
+        The aisle breaks contiguity, so groups wider than a side are split into
+        side-width blocks. The blocks fill both sides of a row before the next
+        row, and the group takes the frontmost run of consecutive rows that fits.
+        """
+        class_rows = self.class_rows.get(class_type)
+        if class_rows is None or size < 1:
+            return None
+        width = max(len(side) for side in SIDES)
+        blocks = [width] * (size // width) + ([size % width] if size % width else [])
+        # Blocks on each row of the group, front to back
+        row_blocks = [blocks[i:i + len(SIDES)] for i in range(0, len(blocks), len(SIDES))]
+        for first in range(len(self.rows) - len(row_blocks) + 1):
+            if not class_rows[first:first + len(row_blocks)].all():
+                continue
+            placement = []
+            for r, blocks_in_row in enumerate(row_blocks, start=first):
+                sides = self._sides_for(r, blocks_in_row)
+                if sides is None:
+                    break
+                placement.extend((r, side, block) for side, block in zip(sides, blocks_in_row))
+            else:
+                return [seat_id for r, side, block in placement for seat_id in self._block_in_side(r, side, block)]
+        return None
+
+    def is_free(self, row_number: int, seat_letter: str) -> bool:
+        r = self.row_index.get(row_number)
+        c = self.letter_index.get(seat_letter)
+        return r is not None and c is not None and bool(self.free[r, c])
+
+    def _side_bounds(self, c: int) -> Tuple[int, int]:
+        side = self.side_of[c]
+        start = self.side_starts[side]
+        return start, start + len(SIDES[side])
+
+    def free_neighbours(self, seat_id: int) -> List[int]:
+        """Free seats directly beside a seat, on the same side of the aisle"""
+        r, c = self.position[seat_id]
+        start, end = self._side_bounds(c)
+        return [
+            int(self.seat_ids[r, n]) for n in (c - 1, c + 1)
+            if start <= n < end and self.free[r, n]
+        ]
+
+    def block_at(self, seat_id: int, size: int) -> Optional[List[int]]:
+        """
+        A block of `size` free seats in the seat's row and side that includes it,
+        or None. Prefers the block starting nearest the window.
+        """
+        r, c = self.position[seat_id]
+        start, end = self._side_bounds(c)
+        for first in range(max(start, c - size + 1), min(c, end - size) + 1):
+            if self.free[r, first:first + size].all():
+                return [int(seat_id) for seat_id in self.seat_ids[r, first:first + size]]
+        return None
@@ -0,0 +1,88 @@
+import json
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from backend.services.inventory_service import FlightInventory, inventory_service
+
+class SeatMapSnapshot:
+    """One serialized seat map and the inventory version it was built from"""
+
+    def __init__(self, version: int, etag: str, body: bytes):
+        self.version = version
+        self.etag = etag
+        self.body = body
+
+class SeatMapCache:
+    """
+    Serialized seat maps per flight, built from the in-memory inventory.
+    A snapshot stays valid until the inventory's version moves on (a purchase
+    commits), so reads between two purchases cost neither a query nor a
+    serialization, and clients holding the current ETag get a 304.
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[Tuple[int, str], SeatMapSnapshot] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    @staticmethod
+    def etag(inventory: FlightInventory, version: int, fmt: str) -> str:
+        # The load time keeps tags from before a restart or reload from matching
+        return f'"{inventory.flight_id}-{inventory.loaded_at:x}-{version}-{fmt}"'
+
+    def get(self, inventory: FlightInventory, fmt: str = "json",
+            encode: Callable[[FlightInventory, list], object] = None) -> SeatMapSnapshot:
+        """The flight's seat map in a format, rebuilt only if a seat changed since it was cached"""
+        key = (inventory.flight_id, fmt)
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot.etag == self.etag(inventory, inventory.version, fmt):
+            with self._lock:
+                self.hits += 1
+            return snapshot
+
+        version, seats = inventory.seat_map()
+        payload = encode(inventory, seats) if encode else seats
+        snapshot = SeatMapSnapshot(
+            version,
+            self.etag(inventory, version, fmt),
+            json.dumps(payload, separators=(",", ":")).encode()
+        )
+        with self._lock:
+            self.builds += 1
+            # A build racing a newer one at worst costs the next reader a rebuild;
+            # throwaway inventories of departed or unknown flights are never cached
+            if inventory_service.is_kept(inventory):
+                self._snapshots[key] = snapshot
+        return snapshot
+
+    @staticmethod
+    def matches(if_none_match: Optional[str], etag: str) -> bool:
+        """Whether an If-None-Match header already names this snapshot"""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    def evict(self, flight_id: int):
+        with self._lock:
+            for key in [key for key in self._snapshots if key[0] == flight_id]:
+                del self._snapshots[key]
+
+    def memory_usage(self) -> dict:
+        snapshots = list(self._snapshots.items())
+        return {
+            "flights": len({flight_id for (flight_id, _), _ in snapshots}),
+            "snapshots": len(snapshots),
+            "bytes": sum(len(snapshot.body) for _, snapshot in snapshots)
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            "snapshots": len(self._snapshots),
+            "hits": self.hits,
+            "builds": self.builds
+        }
+
+# Global instance
+seat_map_cache = SeatMapCache()
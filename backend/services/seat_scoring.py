@@ -0,0 +1,87 @@
+from typing import Dict, List, Optional
+import numpy as np
+
+class SeatTable:
+    """Array-backed seat features for one flight, in (row, letter) order"""
+
+    def __init__(self, seats: List[dict]):
+        self.seat_ids = np.array([seat['id'] for seat in seats], dtype=np.int64)
+        self.index: Dict[int, int] = {seat['id']: i for i, seat in enumerate(seats)}
+        self.is_window = np.array([bool(seat['is_window']) for seat in seats], dtype=bool)
+        self.is_aisle = np.array([bool(seat['is_aisle']) for seat in seats], dtype=bool)
+        self.is_extra_legroom = np.array([bool(seat['is_extra_legroom']) for seat in seats], dtype=bool)
+        self.base_price = np.array([seat['base_price'] for seat in seats], dtype=np.float64)
+        self.class_names: List[str] = sorted({seat['class_type'] for seat in seats})
+        codes = {name: code for code, name in enumerate(self.class_names)}
+        self.class_codes = np.array([codes[seat['class_type']] for seat in seats], dtype=np.int8)
+        self.available = np.array([not seat['is_occupied'] for seat in seats], dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.seat_ids)
+
+    def set_available(self, seat_id: int, available: bool):
+        self.available[self.index[seat_id]] = available
+
+def score_seats(table: SeatTable, candidates: np.ndarray, preferences: dict,
+                rng: np.random.Generator, decisions: int = 1) -> np.ndarray:
+    """
+    Score candidate seats (table indices) for a number of independent bot decisions.
+    Returns a (decisions, len(candidates)) array of scores.
+    """
+    shape = (decisions, len(candidates))
+    is_window = table.is_window[candidates]
+    is_aisle = table.is_aisle[candidates]
+    is_extra_legroom = table.is_extra_legroom[candidates]
+    prices = table.base_price[candidates]
+
+    # Window, aisle and extra legroom each appeal to a share of bots
+    scores = 3.0 * (is_window & (rng.random(shape) < preferences['window_preference']))
+    scores += 2.0 * (is_aisle & (rng.random(shape) < preferences['aisle_preference']))
+    scores += 2.0 * (is_extra_legroom & (rng.random(shape) < preferences['extra_legroom_preference']))
+
+    # Class preference
+    class_pref = np.array([preferences['class_preference'].get(name, 0) for name in table.class_names])
+    scores += class_pref[table.class_codes[candidates]] * 15
+
+    # Price sensitivity (lower price = higher score)
+    max_price = prices.max()
+    min_price = prices.min()
+    if max_price > min_price:
+        price_score = 1 - (prices - min_price) / (max_price - min_price)
+        scores += price_score * preferences['price_sensitivity'] * 3
+
+    # Add some randomness
+    scores += rng.random(shape) * 2
+    return scores
+
+def select_seats(table: SeatTable, preferences: dict, rng: np.random.Generator,
+                 decisions: int = 1) -> List[Optional[int]]:
+    """
+    Choose a seat for each of a number of bot decisions.
+    Each decision picks among its top 3 seats with probability weighted by score.
+    Returns table indices (None when nothing is available); decisions are
+    independent, so the same seat can be chosen more than once.
+    """
+    candidates = np.flatnonzero(table.available)
+    if len(candidates) == 0:
+        return [None] * decisions
+
+    scores = score_seats(table, candidates, preferences, rng, decisions)
+
+    # Top 3 per decision, highest first (ties keep seat order, like a stable sort)
+    order = np.argsort(-scores, axis=1, kind='stable')[:, :3]
+    top_scores = np.take_along_axis(scores, order, axis=1)
+    totals = top_scores.sum(axis=1)
+
+    # Select based on score
+    r = rng.random(decisions) * totals
+    picks = (np.cumsum(top_scores, axis=1) < r[:, None]).sum(axis=1)
+    picks = np.minimum(picks, order.shape[1] - 1)
+    chosen = order[np.arange(decisions), picks]
+
+    # Fallback to random selection when the top seats score nothing
+    no_score = totals == 0
+    if no_score.any():
+        chosen[no_score] = rng.integers(0, len(candidates), no_score.sum())
+
+    return [int(candidates[i]) for i in chosen]
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+
+from backend.config.config import settings
+from backend.db.database import AsyncSessionLocal
+from backend.models.seat import Seat
+from backend.utils.metrics import LatencyStats
+
+# Durability modes
+DURABILITY_BUFFERED = "buffered"    # Write-behind: sold seats are written on the next flush
+DURABILITY_IMMEDIATE = "immediate"  # Write-through: every purchase commits before it is confirmed
+
+class SeatWriteBuffer:
+    """
+    Write-behind persistence of sold seats.
+    The in-memory inventory already owns seat state, so purchases only need
+    to reach the Seat table eventually: they are collected across all flights
+    and written as one bulk UPDATE in one transaction per flush interval.
+    """
+
+    def __init__(self, flush_interval: float = None, durability: str = None):
+        self.flush_interval = flush_interval or settings.SEAT_WRITE_FLUSH_INTERVAL
+        self.durability = durability or settings.SEAT_WRITE_DURABILITY
+        if self.durability not in (DURABILITY_BUFFERED, DURABILITY_IMMEDIATE):
+            raise ValueError(f"Unknown seat write durability: {self.durability}")
+        # seat_id -> column values; a later write of the same seat replaces the earlier one
+        self._pending: Dict[int, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.flush_stats = LatencyStats()
+        self.written = 0
+        self.failed_flushes = 0
+
+    async def write(self, seat_id: int, sale_price: float, days_until_departure: int):
+        """
+        Persist a sold seat. In buffered mode this only queues it; in immediate
+        mode it is written before returning and errors are raised to the caller.
+        """
+        await self.write_many([(seat_id, sale_price, days_until_departure)])
+
+    async def write_many(self, sales: List[Tuple[int, float, int]], immediate: bool = False):
+        """
+        Persist several sold seats, given as (seat_id, sale_price, days_until_departure).
+        They are written together, in one transaction, when the durability mode
+        is immediate or `immediate` is set.
+        """
+        batch = {
+            seat_id: {
+                'id': seat_id,
+                'is_occupied': True,
+                'sale_price': sale_price,
+                'days_until_departure': days_until_departure
+            }
+            for seat_id, sale_price, days_until_departure in sales
+        }
+        if immediate or self.durability == DURABILITY_IMMEDIATE:
+            await self._write(batch)
+            self.written += len(batch)
+            return
+        self._pending.update(batch)
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def _write(self, batch: Dict[int, dict]):
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            # ORM bulk UPDATE by primary key: one executemany in one transaction
+            async with db.begin():
+                await db.execute(update(Seat), list(batch.values()))
+        self.flush_stats.record(time.perf_counter() - started)
+
+    async def flush(self) -> int:
+        """Write everything pending now; returns the number of seats written"""
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            await self._write(batch)
+        except Exception:
+            # Keep anything written to the same seats since the batch was taken
+            batch.update(self._pending)
+            self._pending = batch
+            self.failed_flushes += 1
+            raise
+        self.written += len(batch)
+        return len(batch)
+
+    def start(self):
+        """Flush every flush_interval seconds"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still pending"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Error writing sold seats on shutdown: {e}")
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"Error writing sold seats: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    def get_stats(self) -> dict:
+        return {
+            "durability": self.durability,
+            "flush_interval": self.flush_interval,
+            "pending": len(self._pending),
+            "written": self.written,
+            "failed_flushes": self.failed_flushes,
+            "flush_duration": self.flush_stats.to_dict()
+        }
+
+# Global instance
+seat_write_buffer = SeatWriteBuffer()
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+
+from backend.config.config import settings
+
+class SimulationClock(ABC):
+    """
+    Simulated time, in hours, for the simulation engine.
+    Subclasses decide how simulated time relates to wall-clock time.
+    """
+
+    mode = "base"
+
+    def __init__(self, start_hours: float = 0.0):
+        self._start_hours = start_hours
+
+    @abstractmethod
+    def now(self) -> float:
+        """Current simulated time in hours"""
+
+    def wall_seconds(self, hours: float) -> float:
+        """Wall-clock seconds that a span of simulated hours takes"""
+        return 0.0
+
+    @abstractmethod
+    async def wait_until(self, hours: float, wakeup: asyncio.Event):
+        """Wait until simulated time reaches `hours`, or return early when `wakeup` is set"""
+
+    def describe(self) -> dict:
+        return {"mode": self.mode, "now_hours": round(self.now(), 3)}
+
+class RealTimeClock(SimulationClock):
+    """Simulated time runs at a fixed multiple of wall-clock time"""
+
+    mode = "realtime"
+
+    def __init__(self, acceleration: float = None, start_hours: float = 0.0):
+        super().__init__(start_hours)
+        # Simulated seconds per wall-clock second
+        self.acceleration = acceleration or settings.SIMULATION_ACCELERATION
+        self._started = time.monotonic()
+
+    def now(self) -> float:
+        return self._start_hours + (time.monotonic() - self._started) * self.acceleration / 3600
+
+    def wall_seconds(self, hours: float) -> float:
+        return hours * 3600 / self.acceleration
+
+    async def wait_until(self, hours: float, wakeup: asyncio.Event):
+        delay = self.wall_seconds(hours - self.now())
+        if delay <= 0:
+            return
+        try:
+            await asyncio.wait_for(wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def describe(self) -> dict:
+        return {**super().describe(), "acceleration": self.acceleration}
+
+class FastForwardClock(SimulationClock):
+    """Simulated time jumps straight to the next due tick; nothing ever sleeps"""
+
+    mode = "fast_forward"
+
+    def __init__(self, start_hours: float = 0.0):
+        super().__init__(start_hours)
+        self._now = start_hours
+
+    def now(self) -> float:
+        return self._now
+
+    async def wait_until(self, hours: float, wakeup: asyncio.Event):
+        if hours > self._now:
+            self._now = hours
+        # Still yield, so WebSocket handlers and departures keep running
+        await asyncio.sleep(0)
+
+class ManualClock(SimulationClock):
+    """Simulated time only moves when advance() is called, e.g. from tests"""
+
+    mode = "manual"
+
+    def __init__(self, start_hours: float = 0.0):
+        super().__init__(start_hours)
+        self._now = start_hours
+        self._wakeup: asyncio.Event = None
+
+    def now(self) -> float:
+        return self._now
+
+    def advance(self, hours: float):
+        self._now += hours
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def wait_until(self, hours: float, wakeup: asyncio.Event):
+        self._wakeup = wakeup
+        if hours <= self._now:
+            return
+        await wakeup.wait()
+
+CLOCKS = {
+    RealTimeClock.mode: RealTimeClock,
+    FastForwardClock.mode: FastForwardClock,
+    ManualClock.mode: ManualClock,
+}
+
+def create_clock(mode: str = None, acceleration: float = None, start_hours: float = 0.0) -> SimulationClock:
+    """Create a clock by mode name: realtime, fast_forward or manual"""
+    mode = mode or settings.SIMULATION_CLOCK_MODE
+    if mode not in CLOCKS:
+        raise ValueError(f"Unknown simulation clock mode: {mode}")
+    if mode == RealTimeClock.mode:
+        return RealTimeClock(acceleration, start_hours)
+    return CLOCKS[mode](start_hours)
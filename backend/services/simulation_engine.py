@@ -0,0 +1,218 @@
+import asyncio
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+from backend.config.config import settings
+from backend.utils.metrics import LatencyStats
+from backend.services.sim_clock import SimulationClock, ManualClock, create_clock
+
+class FlightSimulation:
+    """Scheduling state of one flight in the engine"""
+
+    def __init__(self, flight_id: int):
+        self.flight_id = flight_id
+        self.timer = False   # Countdown registered
+        self.bots = False    # Bot purchasing registered
+        self.next_due: Optional[float] = None
+
+    def is_idle(self) -> bool:
+        return not self.timer and not self.bots
+
+class SimulationEngine:
+    """
+    Advances every simulated flight from one tick loop.
+    Flights sit in a heap ordered by their next due time in simulated hours;
+    each tick pops the flights that are due, runs their bot purchasing and
+    countdown, and pushes them back one tick later. The clock decides how
+    simulated hours map to wall-clock time.
+    """
+
+    def __init__(self, clock: SimulationClock = None, hours_per_tick: int = None, bot_steps_per_tick: int = None):
+        self.clock = clock or create_clock()
+        self.hours_per_tick = hours_per_tick or settings.SIMULATION_HOURS_PER_TICK
+        self.bot_steps_per_tick = bot_steps_per_tick or settings.SIMULATION_BOT_STEPS_PER_TICK
+        self._flights: Dict[int, FlightSimulation] = {}
+        self._heap: List[Tuple[float, int, int]] = []  # (due simulated hour, tie-breaker, flight_id)
+        self._counter = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        # Per-tick timing
+        self.tick_stats = LatencyStats()
+        self.lag_stats = LatencyStats()
+        self.ticks = 0
+        self.last_flights_per_tick = 0
+        self.max_flights_per_tick = 0
+
+    def _now(self) -> float:
+        return self.clock.now()
+
+    def set_clock(self, clock: SimulationClock):
+        """Swap the clock; the new one should start from the current clock's now()"""
+        self.clock = clock
+        if isinstance(clock, ManualClock):
+            # Manual time is driven by advance(), not the background loop
+            if self._task and not self._task.done():
+                self._task.cancel()
+            self._task = None
+        elif self._flights:
+            self._ensure_running()
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _flight(self, flight_id: int) -> FlightSimulation:
+        flight = self._flights.get(flight_id)
+        if flight is None:
+            flight = self._flights[flight_id] = FlightSimulation(flight_id)
+        return flight
+
+    def _schedule(self, flight: FlightSimulation, due: float):
+        flight.next_due = due
+        self._counter += 1
+        heapq.heappush(self._heap, (due, self._counter, flight.flight_id))
+
+    def _register(self, flight_id: int, kind: str):
+        flight = self._flight(flight_id)
+        setattr(flight, kind, True)
+        if flight.next_due is None:
+            self._schedule(flight, self._now())
+        self._ensure_running()
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _unregister(self, flight_id: int, kind: str):
+        flight = self._flights.get(flight_id)
+        if flight is None:
+            return
+        setattr(flight, kind, False)
+        if flight.is_idle():
+            # Its heap entry is skipped when popped
+            del self._flights[flight_id]
+
+    def add_timer(self, flight_id: int):
+        self._register(flight_id, "timer")
+
+    def remove_timer(self, flight_id: int):
+        self._unregister(flight_id, "timer")
+
+    def has_timer(self, flight_id: int) -> bool:
+        flight = self._flights.get(flight_id)
+        return bool(flight and flight.timer)
+
+    def add_bots(self, flight_id: int):
+        self._register(flight_id, "bots")
+
+    def remove_bots(self, flight_id: int):
+        self._unregister(flight_id, "bots")
+
+    def has_bots(self, flight_id: int) -> bool:
+        flight = self._flights.get(flight_id)
+        return bool(flight and flight.bots)
+
+    def flight_ids(self) -> List[int]:
+        """Flights with a countdown or bots registered"""
+        return list(self._flights)
+
+    def _ensure_running(self):
+        if isinstance(self.clock, ManualClock):
+            return
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the tick loop; registered flights stay registered"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        # Imported here to avoid circular imports; both services register with the engine
+        from backend.services.bot_service import bot_service
+        from backend.services.countdown_service import countdown_service
+        try:
+            while True:
+                if not self._heap:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                due = self._heap[0][0]
+                if due > self._now():
+                    self._wakeup.clear()
+                    await self.clock.wait_until(due, self._wakeup)
+                    continue
+                await self._tick(bot_service, countdown_service)
+                # Let WebSocket handlers and other tasks run between ticks
+                await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            pass
+
+    async def advance(self, hours: float):
+        """
+        Manual step mode: move a ManualClock forward and run every tick that
+        falls due, without the background loop. Meant for tests.
+        """
+        if not isinstance(self.clock, ManualClock):
+            raise RuntimeError("advance() needs the manual simulation clock")
+        from backend.services.bot_service import bot_service
+        from backend.services.countdown_service import countdown_service
+        target = self.clock.now() + hours
+        while self._heap and self._heap[0][0] <= target:
+            self.clock.advance(max(0.0, self._heap[0][0] - self.clock.now()))
+            await self._tick(bot_service, countdown_service)
+        self.clock.advance(max(0.0, target - self.clock.now()))
+
+    async def _tick(self, bot_service, countdown_service):
+        """Advance every flight that is due"""
+        started = self._now()
+        wall_started = time.perf_counter()
+        advanced = 0
+        while self._heap and self._heap[0][0] <= started:
+            due, _, flight_id = heapq.heappop(self._heap)
+            flight = self._flights.get(flight_id)
+            if flight is None or flight.next_due != due:
+                # Unregistered, or rescheduled since this entry was pushed
+                continue
+            self.lag_stats.record(self.clock.wall_seconds(started - due))
+            try:
+                if flight.bots:
+                    for _ in range(self.bot_steps_per_tick):
+                        if not await bot_service.step(flight_id):
+                            bot_service.stop_bots(flight_id)
+                            break
+                if flight.timer and countdown_service.tick(flight_id, self.hours_per_tick):
+                    self.remove_timer(flight_id)
+            except Exception as e:
+                print(f"Error advancing flight {flight_id}: {e}")
+            advanced += 1
+            if self._flights.get(flight_id) is flight:
+                # Keep a fixed cadence, but don't try to catch up on ticks we fell behind on
+                next_due = due + self.hours_per_tick
+                if next_due <= started:
+                    next_due = started + self.hours_per_tick
+                self._schedule(flight, next_due)
+        self.ticks += 1
+        self.last_flights_per_tick = advanced
+        self.max_flights_per_tick = max(self.max_flights_per_tick, advanced)
+        self.tick_stats.record(time.perf_counter() - wall_started)
+
+    def memory_usage(self) -> dict:
+        return {"flights": len(self._flights), "scheduled": len(self._heap)}
+
+    def get_stats(self) -> dict:
+        return {
+            "active_flights": len(self._flights),
+            "timers": sum(1 for f in self._flights.values() if f.timer),
+            "bots": sum(1 for f in self._flights.values() if f.bots),
+            "clock": self.clock.describe(),
+            "hours_per_tick": self.hours_per_tick,
+            "tick_interval_ms": round(self.clock.wall_seconds(self.hours_per_tick) * 1000, 3),
+            "ticks": self.ticks,
+            "last_flights_per_tick": self.last_flights_per_tick,
+            "max_flights_per_tick": self.max_flights_per_tick,
+            "tick_duration": self.tick_stats.to_dict(),
+            "tick_lag": self.lag_stats.to_dict()
+        }
+
+# Global instance
+simulation_engine = SimulationEngine()
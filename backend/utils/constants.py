@@ -1,4 +1,7 @@
-from typing import TypedDict, Dict
+import io
+from functools import lru_cache
+from typing import TypedDict, Dict, Tuple
+from sqlalchemy import insert
 from backend.db.database import SessionLocal
 from backend.models.flight import Flight
 from backend.models.seat import Seat
@@ -8,6 +11,111 @@ class FlightStatus(TypedDict):
     hours_remaining: int
     is_active: bool
 
+class SeatLayout:
+    """Static seat data of one aircraft configuration, computed once and shared by every flight"""
+    
+    # Columns of a seats row, in the order used for bulk inserts and COPY
+    COLUMNS = (
+        'flight_id', 'created_at', 'updated_at', 'row_number', 'seat_letter', 'class_type',
+        'is_occupied', 'is_window', 'is_aisle', 'is_middle', 'is_extra_legroom',
+        'base_price', 'sale_price', 'days_until_departure'
+    )
+    
+    def __init__(self, seats: Tuple[dict, ...]):
+        self.seats = seats
+        # Everything after flight_id/created_at/updated_at, pre-rendered as CSV for COPY
+        self.csv_suffixes = tuple(
+            ",".join(_csv_value(seat[column]) for column in self.COLUMNS[3:])
+            for seat in seats
+        )
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value)
+
+@lru_cache(maxsize=32)
+def get_seat_layout(
+    num_rows: int,
+    first_class_rows: int,
+    business_class_rows: int,
+    extra_legroom_rows: Tuple[int, ...],
+    first_class_price: float,
+    business_class_price: float,
+    economy_class_price: float,
+    window_aisle_extra: float,
+    legroom_extra: float
+) -> SeatLayout:
+    """Compute (once per configuration) the class, features and price of every seat"""
+    rows = range(1, num_rows + 1)
+    seat_letters = ['A', 'B', 'C', 'D', 'E', 'F']
+    seats = []
+    
+    for row in rows:
+        for letter in seat_letters:
+            # Determine seat class
+            if row <= first_class_rows:
+                class_type = "first"
+                base_price = first_class_price
+            elif row <= business_class_rows:
+                class_type = "business"
+                base_price = business_class_price
+            else:
+                class_type = "economy"
+                base_price = economy_class_price
+            
+            # Determine seat properties
+            is_window = letter in ['A', 'F']
+            is_middle = letter in ['B', 'E']
+            is_aisle = letter in ['C', 'D']
+            is_extra_legroom = row in extra_legroom_rows
+            
+            # Add extra for window/aisle and extra legroom
+            if is_window or is_aisle:
+                base_price += window_aisle_extra
+            if is_extra_legroom:
+                base_price += legroom_extra
+            
+            seats.append({
+                'row_number': row,
+                'seat_letter': letter,
+                'class_type': class_type,
+                'is_occupied': False,
+                'is_window': is_window,
+                'is_aisle': is_aisle,
+                'is_middle': is_middle,
+                'is_extra_legroom': is_extra_legroom,
+                'base_price': float(base_price),
+                'sale_price': None,
+                'days_until_departure': 120  # Start with 120 days until departure
+            })
+    
+    return SeatLayout(tuple(seats))
+
+def _copy_seats(db, flight_id: int, layout: SeatLayout, now: datetime) -> bool:
+    """
+    Insert a flight's seats with PostgreSQL COPY, in the session's transaction.
+    Returns False when the connection is not PostgreSQL/psycopg2, so the caller
+    falls back to a bulk INSERT.
+    """
+    connection = db.connection()
+    if connection.dialect.name != "postgresql" or connection.dialect.driver != "psycopg2":
+        return False
+    
+    prefix = f"{flight_id},{now.isoformat()},{now.isoformat()},"
+    data = io.StringIO("\n".join(prefix + suffix for suffix in layout.csv_suffixes))
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {Seat.__tablename__} ({', '.join(SeatLayout.COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            data
+        )
+    finally:
+        cursor.close()
+    return True
+
 def create_seats(
     flight_id: int, 
     db,
@@ -25,6 +133,9 @@ def create_seats(
     """
     STRUCT to create all seats for a given flight.
     
+    The layout is computed once per aircraft configuration and cached; the seats
+    are written with COPY on PostgreSQL, otherwise with one executemany INSERT.
+    
     Args:
         flight_id: The ID of the flight to create seats for
         db: The database session to use
@@ -37,63 +148,25 @@ def create_seats(
         economy_class_price: Base price for economy class seats
         window_aisle_extra: Extra charge for window/aisle seats
         legroom_extra: Extra charge for extra legroom seats
-        batch_size: If set, seats will be added in batches of this size
+        batch_size: If set, the INSERT fallback sends seats in batches of this size
     """
-    rows = range(1, num_rows + 1)
-    seat_letters = ['A', 'B', 'C', 'D', 'E', 'F']
-    seats = []
+    layout = get_seat_layout(
+        num_rows, first_class_rows, business_class_rows, tuple(extra_legroom_rows),
+        float(first_class_price), float(business_class_price), float(economy_class_price),
+        float(window_aisle_extra), float(legroom_extra)
+    )
+    now = datetime.utcnow()
     
-    for row in rows:
-        for letter in seat_letters:
-            # Determine seat class
-            if row <= first_class_rows:
-                class_type = "first"
-                base_price = first_class_price
-            elif row <= business_class_rows:
-                class_type = "business"
-                base_price = business_class_price
-            else:
-                class_type = "economy"
-                base_price = economy_class_price
-            
-            # Determine seat properties
-            is_window = letter in ['A', 'F']
-            is_middle = letter in ['B', 'E']
-            is_aisle = letter in ['C', 'D']
-            is_extra_legroom = row in extra_legroom_rows
-            
-            # Add extra for window/aisle and extra legroom
-            if is_window or is_aisle:
-                base_price += window_aisle_extra
-            if is_extra_legroom:
-                base_price += legroom_extra
-            
-            # Create the seat
-            seat = Seat(
-                flight_id=flight_id,
-                row_number=row,
-                seat_letter=letter,
-                is_occupied=False,
-                class_type=class_type,
-                is_window=is_window,
-                is_aisle=is_aisle,
-                is_middle=is_middle,
-                is_extra_legroom=is_extra_legroom,
-                base_price=base_price,
-                days_until_departure=120  # Start with 120 days until departure
-            )
-            
-            if batch_size:
-                seats.append(seat)
-                if len(seats) >= batch_size:
-                    db.add_all(seats)
-                    seats = []
-            else:
-                db.add(seat)
+    if _copy_seats(db, flight_id, layout, now):
+        return
     
-    # Add any remaining seats if using batch mode
-    if batch_size and seats:
-        db.add_all(seats)
+    rows = [
+        {**seat, 'flight_id': flight_id, 'created_at': now, 'updated_at': now}
+        for seat in layout.seats
+    ]
+    batch_size = batch_size or len(rows)
+    for start in range(0, len(rows), batch_size):
+        db.execute(insert(Seat), rows[start:start + batch_size])
 
 def create_next_flight(previous_flight_number: str = None) -> int:
     """
@@ -167,5 +240,12 @@ class FlightStateManager:
         if flight_id in self.flight_states:
             self.flight_states[flight_id]["is_active"] = False
 
+    def remove(self, flight_id: int):
+        """Forget a flight that has departed"""
+        self.flight_states.pop(flight_id, None)
+
+    def memory_usage(self) -> dict:
+        return {"flights": len(self.flight_states)}
+
 # Global instance
 flight_state_manager = FlightStateManager() 
\ No newline at end of file
@@ -0,0 +1,42 @@
+from typing import Dict, Tuple
+
+class LatencyStats:
+    """Running count, total, max and a fixed-bucket histogram of durations in seconds"""
+
+    DEFAULT_BUCKETS: Tuple[float, ...] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self, buckets: Tuple[float, ...] = None):
+        self.buckets = buckets or self.DEFAULT_BUCKETS
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        # One slot per bucket plus one for everything above the last bucket
+        self.histogram = [0] * (len(self.buckets) + 1)
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.histogram[i] += 1
+                return
+        self.histogram[-1] += 1
+
+    def to_dict(self) -> Dict:
+        """Summary in milliseconds, with histogram buckets keyed by their upper bound"""
+        histogram = {f"<={bound * 1000:g}ms": n for bound, n in zip(self.buckets, self.histogram)}
+        histogram[f">{self.buckets[-1] * 1000:g}ms"] = self.histogram[-1]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "last_ms": round(self.last * 1000, 3),
+            "histogram": histogram
+        }
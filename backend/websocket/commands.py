@@ -0,0 +1,51 @@
+from typing import Annotated, Literal, Optional, Union
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+
+class SeatRef(BaseModel):
+    id: int = Field(gt=0)
+
+class SeatPurchase(SeatRef):
+    # Only purchases are accepted; a seat can't be marked free from a client.
+    # The price is set by the server when the purchase commits.
+    is_occupied: Literal[True]
+
+class FlightCommand(BaseModel):
+    """Fields shared by every client command"""
+    # A client-chosen key; resubmitting a command with the same key returns the first result
+    idempotency_key: Optional[str] = Field(default=None, max_length=64)
+
+class PurchaseCommand(FlightCommand):
+    type: Literal["SEAT_UPDATE"]
+    seat: SeatPurchase
+
+class GroupPurchaseCommand(FlightCommand):
+    type: Literal["GROUP_PURCHASE"]
+    size: int = Field(ge=1)
+    class_type: str
+
+class HoldCommand(FlightCommand):
+    type: Literal["SEAT_HOLD"]
+    seat: SeatRef
+
+class ReleaseCommand(FlightCommand):
+    type: Literal["SEAT_RELEASE"]
+    seat: SeatRef
+
+Command = Annotated[
+    Union[PurchaseCommand, GroupPurchaseCommand, HoldCommand, ReleaseCommand],
+    Field(discriminator="type")
+]
+
+_command_adapter = TypeAdapter(Command)
+
+def parse_command(data: dict) -> Command:
+    """Validate a client message into a command; raises ValueError if it is not one"""
+    try:
+        return _command_adapter.validate_python(data)
+    except ValidationError as e:
+        errors = "; ".join(
+            f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" if err['loc'] else err['msg']
+            for err in e.errors()
+        )
+        raise ValueError(errors) from None
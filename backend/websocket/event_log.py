@@ -0,0 +1,76 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import json
+
+from backend.config.config import settings
+
+class FlightEventLog:
+    """Sequence numbers and a bounded buffer of recent broadcasts for each flight"""
+
+    def __init__(self, buffer_size: int = None):
+        self.buffer_size = buffer_size or settings.WS_EVENT_BUFFER_SIZE
+        self._seq: Dict[int, int] = {}
+        self._buffers: Dict[int, Deque[Tuple[int, str, str]]] = {}  # (seq, json text, compact text)
+
+    def current_seq(self, flight_id: int) -> int:
+        """Sequence number of the last event broadcast for a flight (0 if none)"""
+        return self._seq.get(flight_id, 0)
+
+    def sequences(self) -> Dict[int, int]:
+        """Last sequence number of every flight"""
+        return dict(self._seq)
+
+    def restore_sequence(self, flight_id: int, seq: int):
+        """Continue a flight's numbering after a restart, so resuming clients get a snapshot"""
+        if seq > self._seq.get(flight_id, 0):
+            self._seq[flight_id] = seq
+
+    def evict(self, flight_id: int):
+        """Drop a departed flight's numbering and buffer; a late resume gets a snapshot"""
+        self._seq.pop(flight_id, None)
+        self._buffers.pop(flight_id, None)
+
+    def memory_usage(self) -> dict:
+        return {
+            "flights": len(self._seq),
+            "buffered": sum(len(buffer) for buffer in self._buffers.values())
+        }
+
+    def record(self, flight_id: int, message: dict, compact_message: dict = None) -> Tuple[str, str]:
+        """
+        Stamp a message with the next sequence number, buffer it and return its
+        encodings for JSON and compact clients. Messages without a compact
+        variant are sent to both as they are.
+        """
+        seq = self._seq.get(flight_id, 0) + 1
+        self._seq[flight_id] = seq
+        text = self._encode(message, seq)
+        compact_text = self._encode(compact_message, seq) if compact_message is not None else text
+        buffer = self._buffers.get(flight_id)
+        if buffer is None:
+            buffer = self._buffers[flight_id] = deque(maxlen=self.buffer_size)
+        buffer.append((seq, text, compact_text))
+        return text, compact_text
+
+    @staticmethod
+    def _encode(message: dict, seq: int) -> str:
+        return json.dumps({**message, "seq": seq}, separators=(",", ":"), ensure_ascii=False)
+
+    def since(self, flight_id: int, last_seq: int, compact: bool = False) -> Optional[List[str]]:
+        """
+        Encoded events after last_seq, oldest first.
+        Returns None when the buffer no longer reaches back to last_seq (or last_seq
+        is ahead of us, e.g. after a restart), in which case a snapshot is needed.
+        """
+        current = self._seq.get(flight_id, 0)
+        if last_seq == current:
+            return []
+        if last_seq > current:
+            return None
+        buffer = self._buffers.get(flight_id)
+        if not buffer or buffer[0][0] > last_seq + 1:
+            return None
+        return [compact_text if compact else text for seq, text, compact_text in buffer if seq > last_seq]
+
+# Global instance
+flight_event_log = FlightEventLog()
@@ -0,0 +1,112 @@
+import asyncio
+from typing import Dict, Optional
+
+from backend.config.config import settings
+from backend.services.inventory_service import inventory_service
+from backend.websocket.ws_manager import manager
+from backend.websocket.seat_codec import seat_codec
+
+class FlightFrame:
+    """Updates for one flight collected since the last frame was sent"""
+
+    def __init__(self):
+        self.time: Optional[dict] = None
+        self.seats: Dict[int, dict] = {}
+
+    def is_empty(self) -> bool:
+        return self.time is None and not self.seats
+
+class FrameAggregator:
+    """Coalesces clock and seat updates into one BATCH_UPDATE per flight per frame"""
+
+    def __init__(self, frame_rate: float = None):
+        self.frame_rate = frame_rate or settings.WS_FRAME_RATE
+        self._frames: Dict[int, FlightFrame] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.frames_sent = 0
+
+    def _frame(self, flight_id: int) -> FlightFrame:
+        frame = self._frames.get(flight_id)
+        if frame is None:
+            frame = self._frames[flight_id] = FlightFrame()
+        self._ensure_running()
+        return frame
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def publish_time(self, flight_id: int, days_until_departure: int, hours: int):
+        """Record the latest clock value; only the newest one per frame is sent"""
+        self._frame(flight_id).time = {
+            "days_until_departure": days_until_departure,
+            "hours": hours
+        }
+
+    def publish_seat(self, flight_id: int, seat: dict):
+        """Record a seat change; later changes to the same seat within a frame are merged"""
+        seats = self._frame(flight_id).seats
+        if seat["id"] in seats:
+            seats[seat["id"]].update(seat)
+        else:
+            seats[seat["id"]] = dict(seat)
+
+    def build_message(self, frame: FlightFrame) -> dict:
+        message = {"type": "BATCH_UPDATE", "seats": list(frame.seats.values())}
+        if frame.time is not None:
+            message.update(frame.time)
+        return message
+
+    def build_compact_message(self, flight_id: int, frame: FlightFrame) -> Optional[dict]:
+        """The same frame with seat changes as index deltas, or None if it has none"""
+        inventory = inventory_service.peek(flight_id)
+        if not frame.seats or inventory is None:
+            return None
+        message = {"type": "BATCH_UPDATE", **seat_codec.encode_updates(inventory, list(frame.seats.values()))}
+        if frame.time is not None:
+            message.update(frame.time)
+        return message
+
+    async def flush_flight(self, flight_id: int):
+        """Send whatever is pending for a flight right away"""
+        frame = self._frames.pop(flight_id, None)
+        if frame is None or frame.is_empty():
+            return
+        await manager.broadcast_to_flight(
+            flight_id, self.build_message(frame), self.build_compact_message(flight_id, frame)
+        )
+        self.frames_sent += 1
+
+    def evict(self, flight_id: int):
+        """Drop anything still pending for a flight that has departed"""
+        self._frames.pop(flight_id, None)
+
+    def memory_usage(self) -> dict:
+        return {"flights": len(self._frames)}
+
+    async def flush(self):
+        """Send one frame for every flight with pending updates"""
+        for flight_id in list(self._frames):
+            await self.flush_flight(flight_id)
+
+    async def _run(self):
+        interval = 1 / self.frame_rate
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"Error sending update frame: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    async def stop(self):
+        """Flush pending frames and stop the frame loop"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        await self.flush()
+
+# Global instance
+frame_aggregator = FrameAggregator()
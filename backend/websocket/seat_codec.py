@@ -0,0 +1,147 @@
+import base64
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.services.inventory_service import FlightInventory, inventory_service
+
+# Seat map wire formats
+FORMAT_JSON = "json"        # One dict with every field per seat (default)
+FORMAT_COMPACT = "compact"  # Static layout once, live state as a bitset and arrays
+FORMATS = (FORMAT_JSON, FORMAT_COMPACT)
+
+# Bits of a seat's feature flags in the compact layout
+FLAG_WINDOW = 1
+FLAG_AISLE = 2
+FLAG_MIDDLE = 4
+FLAG_EXTRA_LEGROOM = 8
+
+def check_format(fmt: Optional[str]) -> str:
+    fmt = fmt or FORMAT_JSON
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown seat map format: {fmt} (expected one of {', '.join(FORMATS)})")
+    return fmt
+
+def delta_encode(values: List[int]) -> List[int]:
+    """[5, 6, 7, 9] -> [5, 1, 1, 2]; small gaps keep sorted indexes and ids short"""
+    return [value - previous for previous, value in zip([0] + values[:-1], values)]
+
+def encode_bitset(bits: np.ndarray) -> str:
+    """Base64 of the bits packed eight to a byte, seat i in bit i % 8 of byte i // 8"""
+    return base64.b64encode(np.packbits(bits.astype(bool), bitorder="little").tobytes()).decode()
+
+class SeatLayoutTemplate:
+    """
+    The parts of a seat map that never change after the seats are created:
+    row, letter, class, features and base price of each seat, in table order.
+    Flights flown with the same aircraft and fares share one template.
+    """
+
+    def __init__(self, seats: List[dict]):
+        self.classes: List[str] = sorted({seat['class_type'] for seat in seats})
+        codes = {name: code for code, name in enumerate(self.classes)}
+        self.rows = [seat['row_number'] for seat in seats]
+        self.letters = "".join(seat['seat_letter'] for seat in seats)
+        self.class_codes = [codes[seat['class_type']] for seat in seats]
+        self.flags = [
+            (FLAG_WINDOW if seat['is_window'] else 0)
+            | (FLAG_AISLE if seat['is_aisle'] else 0)
+            | (FLAG_MIDDLE if seat['is_middle'] else 0)
+            | (FLAG_EXTRA_LEGROOM if seat['is_extra_legroom'] else 0)
+            for seat in seats
+        ]
+        self.base_prices = [seat['base_price'] for seat in seats]
+        body = self._body()
+        self.layout_id = hashlib.sha1(json.dumps(body, separators=(",", ":")).encode()).hexdigest()[:16]
+
+    def _body(self) -> dict:
+        return {
+            "classes": self.classes,
+            "rows": delta_encode(self.rows),
+            "letters": self.letters,
+            "class_codes": self.class_codes,
+            "flags": self.flags,
+            "base_prices": self.base_prices
+        }
+
+    def to_dict(self) -> dict:
+        return {"layout_id": self.layout_id, **self._body()}
+
+class SeatCodec:
+    """Compact encodings of seat maps and seat updates, with layout templates shared across flights"""
+
+    def __init__(self):
+        self._templates: Dict[str, SeatLayoutTemplate] = {}
+        # flight_id -> (inventory load time, layout id)
+        self._flight_layouts: Dict[int, tuple] = {}
+
+    def layout(self, inventory: FlightInventory) -> SeatLayoutTemplate:
+        known = self._flight_layouts.get(inventory.flight_id)
+        if known is not None and known[0] == inventory.loaded_at:
+            return self._templates[known[1]]
+        template = SeatLayoutTemplate(inventory.ordered_seats)
+        template = self._templates.setdefault(template.layout_id, template)
+        # Only flights whose inventory is kept are remembered, so eviction bounds them
+        if inventory_service.is_kept(inventory):
+            self._flight_layouts[inventory.flight_id] = (inventory.loaded_at, template.layout_id)
+        return template
+
+    def evict(self, flight_id: int):
+        """Forget a departed flight's layout; the shared template stays for other flights"""
+        self._flight_layouts.pop(flight_id, None)
+
+    def memory_usage(self) -> dict:
+        return {"flights": len(self._flight_layouts), "templates": len(self._templates)}
+
+    def get_layout(self, layout_id: str) -> Optional[SeatLayoutTemplate]:
+        return self._templates.get(layout_id)
+
+    def encode_seat_map(self, inventory: FlightInventory, seats: List[dict], include_layout: bool = True) -> dict:
+        """
+        A whole seat map: seat ids, which seats are sold as a bitset, and the
+        sale price and days until departure of each sold seat in seat order.
+        seats must be in table order, as returned by FlightInventory.seat_map().
+        """
+        template = self.layout(inventory)
+        sold = [seat for seat in seats if seat['is_occupied']]
+        seat_map = {
+            "format": FORMAT_COMPACT,
+            "flight_id": inventory.flight_id,
+            "layout_id": template.layout_id,
+            "seat_ids": delta_encode([seat['id'] for seat in seats]),
+            "occupied": encode_bitset(np.array([seat['is_occupied'] for seat in seats], dtype=bool)),
+            "sale_prices": [seat['sale_price'] for seat in sold],
+            "sold_days": [seat['days_until_departure'] for seat in sold]
+        }
+        if include_layout:
+            seat_map["layout"] = template.to_dict()
+        return seat_map
+
+    @staticmethod
+    def encode_updates(inventory: FlightInventory, seats: List[dict]) -> dict:
+        """
+        Seat changes as index deltas into the layout: sold seats as
+        [index delta, sale price, days until departure], freed seats as index deltas.
+        """
+        sold, freed = [], []
+        for seat in seats:
+            index = inventory.table.index.get(seat['id'])
+            if index is None:
+                continue
+            if seat.get('is_occupied'):
+                sold.append((index, seat.get('sale_price'), seat.get('days_until_departure')))
+            else:
+                freed.append(index)
+        sold.sort()
+        updates = {}
+        if sold:
+            deltas = delta_encode([index for index, _, _ in sold])
+            updates["sold"] = [[delta, price, days] for delta, (_, price, days) in zip(deltas, sold)]
+        if freed:
+            updates["freed"] = delta_encode(sorted(freed))
+        return updates
+
+# Global instance
+seat_codec = SeatCodec()
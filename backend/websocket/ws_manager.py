@@ -1,68 +1,170 @@
 from fastapi import WebSocket
-from typing import List, Dict
+from typing import List, Dict, Optional, Set
+import asyncio
 import json
 
+from backend.config.config import settings
+from backend.websocket.event_log import flight_event_log
+
+class ClientConnection:
+    """A WebSocket with its own bounded outbound queue and writer task"""
+
+    def __init__(self, websocket: WebSocket, flight_id: int = None, queue_size: int = None, compact: bool = False):
+        self.websocket = websocket
+        self.flight_id = flight_id
+        # Whether the client asked for the compact seat format
+        self.compact = compact
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or settings.WS_SEND_QUEUE_SIZE)
+        self.dropped_messages = 0
+        self.closed = False
+        self._writer_task: Optional[asyncio.Task] = None
+
+    def start(self, on_error):
+        """Start the writer task that drains the queue into the socket"""
+        self._writer_task = asyncio.create_task(self._run_writer(on_error))
+
+    def stop(self):
+        """Stop the writer task; queued messages are discarded"""
+        self.closed = True
+        if self._writer_task and not self._writer_task.done():
+            self._writer_task.cancel()
+
+    async def _run_writer(self, on_error):
+        try:
+            while True:
+                text = await self.queue.get()
+                await self.websocket.send_text(text)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error writing to connection: {e}")
+            on_error(self)
+
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, queue_size: int = None, slow_client_policy: str = None):
         # Store active connections
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
         # Store flight-specific connections
-        self.flight_connections: Dict[int, List[WebSocket]] = {}
+        self.flight_connections: Dict[int, Set[WebSocket]] = {}
+        # Outbound queue and writer task for each socket
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.queue_size = queue_size or settings.WS_SEND_QUEUE_SIZE
+        # What to do when a client's queue is full: "disconnect", "drop_oldest" or "drop_newest"
+        self.slow_client_policy = slow_client_policy or settings.WS_SLOW_CLIENT_POLICY
 
-    async def connect(self, websocket: WebSocket, flight_id: int = None):
-        """Add a WebSocket connection to the manager"""
-        self.active_connections.append(websocket)
+    async def connect(self, websocket: WebSocket, flight_id: int = None, initial_messages: List[str] = None,
+                      compact: bool = False):
+        """
+        Add a WebSocket connection to the manager.
+        initial_messages (already encoded) are queued ahead of any broadcast, so a
+        resuming client sees its missed events before anything newer.
+        Compact clients get the compact variant of flight broadcasts that have one.
+        """
+        client = ClientConnection(websocket, flight_id, self.queue_size, compact)
+        for text in initial_messages or []:
+            try:
+                client.queue.put_nowait(text)
+            except asyncio.QueueFull:
+                client.dropped_messages += 1
+        self.clients[websocket] = client
+        client.start(self._on_write_error)
+        self.active_connections.add(websocket)
         if flight_id:
-            if flight_id not in self.flight_connections:
-                self.flight_connections[flight_id] = []
-            self.flight_connections[flight_id].append(websocket)
+            self.flight_connections.setdefault(flight_id, set()).add(websocket)
             print(f"New connection added for flight {flight_id}. Total connections: {len(self.flight_connections[flight_id])}")
 
     def disconnect(self, websocket: WebSocket, flight_id: int = None):
         """Remove a WebSocket connection from the manager"""
         try:
-            if websocket in self.active_connections:
-                self.active_connections.remove(websocket)
-            
+            client = self.clients.pop(websocket, None)
+            if client:
+                client.stop()
+                if flight_id is None:
+                    flight_id = client.flight_id
+
+            self.active_connections.discard(websocket)
+
             if flight_id and flight_id in self.flight_connections:
                 if websocket in self.flight_connections[flight_id]:
-                    self.flight_connections[flight_id].remove(websocket)
+                    self.flight_connections[flight_id].discard(websocket)
                     print(f"Connection removed for flight {flight_id}. Remaining connections: {len(self.flight_connections[flight_id])}")
-                
+
                 if not self.flight_connections[flight_id]:
                     del self.flight_connections[flight_id]
                     print(f"No more connections for flight {flight_id}")
         except Exception as e:
             print(f"Error in disconnect: {e}")
 
-    async def broadcast_to_flight(self, flight_id: int, message: dict):
+    def _on_write_error(self, client: ClientConnection):
+        self.disconnect(client.websocket, client.flight_id)
+
+    @staticmethod
+    def encode(message: dict) -> str:
+        """Encode a message once so it can be shared by every recipient"""
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    def _enqueue(self, websocket: WebSocket, text: str) -> bool:
+        """Queue encoded text for a socket, applying the slow client policy when full"""
+        client = self.clients.get(websocket)
+        if client is None or client.closed:
+            return False
+        try:
+            client.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            client.dropped_messages += 1
+            if self.slow_client_policy == "drop_oldest":
+                client.queue.get_nowait()
+                client.queue.put_nowait(text)
+                return True
+            if self.slow_client_policy == "drop_newest":
+                return True
+            print(f"Dropping slow client for flight {client.flight_id} ({client.queue.qsize()} messages queued)")
+            self._drop_client(client)
+            return False
+
+    def _drop_client(self, client: ClientConnection):
+        self.disconnect(client.websocket, client.flight_id)
+        asyncio.create_task(self._close_quietly(client.websocket))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def send_personal(self, websocket: WebSocket, message: dict):
+        """Send a message to a single connection through its outbound queue"""
+        self._enqueue(websocket, self.encode(message))
+
+    async def broadcast_to_flight(self, flight_id: int, message: dict, compact_message: dict = None):
         """Broadcast a message to all connections for a specific flight"""
-        if flight_id in self.flight_connections:
-            dead_connections = []
-            for connection in self.flight_connections[flight_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Error broadcasting to connection: {e}")
-                    dead_connections.append(connection)
-            
-            # Clean up dead connections
-            for dead_conn in dead_connections:
-                self.disconnect(dead_conn, flight_id)
+        # Every flight event gets a sequence number, even with no one listening,
+        # so reconnecting clients can tell exactly what they missed
+        text, compact_text = flight_event_log.record(flight_id, message, compact_message)
+        connections = self.flight_connections.get(flight_id)
+        if not connections:
+            return
+        # Copy the set since slow clients may be removed while enqueuing
+        for connection in list(connections):
+            client = self.clients.get(connection)
+            self._enqueue(connection, compact_text if client is not None and client.compact else text)
+
+    def memory_usage(self) -> dict:
+        return {
+            "connections": len(self.active_connections),
+            "flights": len(self.flight_connections),
+            "queued": sum(client.queue.qsize() for client in self.clients.values())
+        }
 
     async def broadcast(self, message: dict):
         """Broadcast a message to all active connections"""
-        dead_connections = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting to connection: {e}")
-                dead_connections.append(connection)
-        
-        # Clean up dead connections
-        for dead_conn in dead_connections:
-            self.disconnect(dead_conn)
+        if not self.active_connections:
+            return
+        text = self.encode(message)
+        for connection in list(self.active_connections):
+            self._enqueue(connection, text)
 
 # Create a global connection manager instance
-manager = ConnectionManager() 
\ No newline at end of file
+manager = ConnectionManager()
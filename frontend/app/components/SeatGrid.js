@@ -19,7 +19,7 @@ export default function SeatGrid({ seats, selectedSeat, onSeatClick }) {
         const seatElement = (
           <div
             key={`${seat.row_number}${seat.seat_letter}`}
-            className={`seat ${seat.class_type.replace(' ', '-')} ${seat.is_occupied ? 'occupied' : ''} ${selectedSeat?.row_number === seat.row_number && selectedSeat?.seat_letter === seat.seat_letter ? 'selected' : ''}`}
+            className={`seat ${seat.class_type.replace(' ', '-')} ${seat.is_occupied ? 'occupied' : ''} ${seat.is_held && !seat.is_occupied && selectedSeat?.id !== seat.id ? 'held' : ''} ${selectedSeat?.row_number === seat.row_number && selectedSeat?.seat_letter === seat.seat_letter ? 'selected' : ''}`}
             onClick={() => onSeatClick(seat)}
           >
             <div style={{ fontWeight: 'bold' }}>{seat.row_number}{seat.seat_letter}</div>
@@ -1,9 +1,10 @@
 import { useEffect, useRef, useCallback, useState } from 'react';
 
-const useWebSocket = (flightId, onMessage) => {
+const useWebSocket = (flightId, onMessage, format = 'json') => {
   const ws = useRef(null);
   const reconnectTimeout = useRef(null);
   const reconnectAttempts = useRef(0);
+  const lastSeq = useRef(null); // Last flight event sequence number seen, used to resume after a drop
   const [isConnected, setIsConnected] = useState(false);
   const MAX_RECONNECT_ATTEMPTS = 5;
   const RECONNECT_DELAY = 3000; // 3 seconds
@@ -23,7 +24,12 @@ const useWebSocket = (flightId, onMessage) => {
     
     // Create WebSocket connection
     try {
-      ws.current = new WebSocket(`ws://localhost:8000/api/v1/ws/flight/${flightId}`);
+      // On reconnect, ask only for the events we missed
+      const params = new URLSearchParams();
+      if (format !== 'json') params.set('format', format);
+      if (lastSeq.current !== null) params.set('last_seq', lastSeq.current);
+      const query = params.toString() ? `?${params}` : '';
+      ws.current = new WebSocket(`ws://localhost:8000/api/v1/ws/flight/${flightId}${query}`);
 
       // Connection opened
       ws.current.onopen = () => {
@@ -36,6 +42,9 @@ const useWebSocket = (flightId, onMessage) => {
       ws.current.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data);
+          if (data.seq !== undefined) {
+            lastSeq.current = data.seq;
+          }
           console.log(`WebSocket message received for flight ${flightId}:`, data);
           onMessage(data);
         } catch (error) {
@@ -76,7 +85,7 @@ const useWebSocket = (flightId, onMessage) => {
       console.error(`Error creating WebSocket connection for flight ${flightId}:`, error);
       setIsConnected(false);
     }
-  }, [flightId, onMessage]);
+  }, [flightId, onMessage, format]);
 
   // Close existing connection when flight ID changes
   useEffect(() => {
@@ -86,8 +95,9 @@ const useWebSocket = (flightId, onMessage) => {
       ws.current = null;
     }
     
-    // Reset reconnect attempts when flight ID changes
+    // Reset reconnect attempts and resume position when flight ID changes
     reconnectAttempts.current = 0;
+    lastSeq.current = null;
     
     // Connect to the new flight
     if (flightId) {
@@ -15,6 +15,7 @@ import RevenueDistribution from './components/RevenueDistribution';
 import PriceEvolution from './components/PriceEvolution';
 import OccupancyHeatMap from './components/OccupancyHeatMap';
 import PriceSensitivity from './components/PriceSensitivity';
+import { decodeSeatMap, applySnapshot, applyUpdates } from './utils/seatCodec';
 
 export default function Home() {
   const [seats, setSeats] = useState([]);
@@ -31,7 +32,14 @@ export default function Home() {
   
   // Use refs to store pending updates
   const pendingSeatUpdates = useRef(new Map());
+  // Static seat layouts already fetched, by layout id
+  const seatLayouts = useRef(new Map());
+  const lastLayoutId = useRef(null);
   const updateTimeout = useRef(null);
+  // Idempotency key of the current checkout, made once per selected seat so a resent purchase is recognised
+  const checkoutKey = useRef(null);
+  // Purchases shown as sold before the server answered: idempotency key -> seats as they were before
+  const pendingPurchases = useRef(new Map());
 
   // Function to fetch the current active flight
   const fetchCurrentFlight = async () => {
@@ -89,6 +97,68 @@ export default function Home() {
           return seat;
         });
       });
+    } else if (data.type === "BATCH_UPDATE" || data.type === "SNAPSHOT") {
+      // One frame carries every seat change since the last frame plus the latest clock;
+      // a snapshot carries every sold seat when a resume gap is too old to replay.
+      // In the compact format both address seats by their index in the layout.
+      if (data.sold || data.freed) {
+        setSeats(prevSeats => applyUpdates(prevSeats, data));
+      } else if (data.occupied !== undefined) {
+        setSeats(prevSeats => applySnapshot(prevSeats, data));
+      } else if (data.seats && data.seats.length > 0) {
+        const updates = new Map(data.seats.map(seat => [seat.id, seat]));
+        setSeats(prevSeats => prevSeats.map(seat =>
+          updates.has(seat.id) ? { ...seat, ...updates.get(seat.id) } : seat
+        ));
+      }
+      if (data.days_until_departure !== undefined) {
+        setDaysUntilDeparture(data.days_until_departure);
+        setHours(data.hours);
+      }
+    } else if (data.type === "SEAT_HELD" || data.type === "SEAT_HOLD_RELEASED") {
+      // Another buyer (or this one) is checking out with a seat, or stopped
+      const isHeld = data.type === "SEAT_HELD";
+      setSeats(prevSeats => prevSeats.map(seat =>
+        seat.id === data.seat_id ? { ...seat, is_held: isHeld } : seat
+      ));
+      if (!isHeld && data.reason === "expired") {
+        // Our own hold ran out before the purchase
+        setSelectedSeat(prev => (prev && prev.id === data.seat_id ? null : prev));
+      }
+    } else if (data.type === "SEAT_HOLDS") {
+      // Seats already held when we connected
+      const held = new Set(data.holds.map(hold => hold.seat_id));
+      setSeats(prevSeats => prevSeats.map(seat =>
+        held.has(seat.id) ? { ...seat, is_held: true } : seat
+      ));
+    } else if (data.type === "PURCHASE_RESULT" || data.type === "GROUP_PURCHASE" || data.type === "GROUP_PURCHASE_FAILED") {
+      const accepted = data.type === "GROUP_PURCHASE" || (data.type === "PURCHASE_RESULT" && data.accepted);
+      const previous = pendingPurchases.current.get(data.idempotency_key) || [];
+      pendingPurchases.current.delete(data.idempotency_key);
+      if (accepted) {
+        // The server sets the price, so take the seats as it sold them
+        const sold = data.seats || (data.seat ? [data.seat] : []);
+        const updates = new Map(sold.map(seat => [seat.id, seat]));
+        setSeats(prevSeats => prevSeats.map(seat =>
+          updates.has(seat.id) ? { ...seat, ...updates.get(seat.id) } : seat
+        ));
+      } else {
+        // Undo what we showed before the server answered
+        console.warn(`Purchase rejected: ${data.reason || 'unknown reason'}`);
+        const restore = new Map(previous.map(seat => [seat.id, seat]));
+        setSeats(prevSeats => prevSeats.map(seat =>
+          restore.has(seat.id) ? { ...seat, ...restore.get(seat.id) } : seat
+        ));
+      }
+      if (data.type === "PURCHASE_RESULT") {
+        if (data.idempotency_key === checkoutKey.current) {
+          checkoutKey.current = null;
+        }
+        setSelectedSeat(prev => (prev && prev.id === data.seat_id ? null : prev));
+      }
+    } else if (data.type === "SEAT_HOLD_FAILED") {
+      // Someone else got the seat first
+      setSelectedSeat(prev => (prev && prev.id === data.seat_id ? null : prev));
     } else if (data.type === "TIME_UPDATE") {
       // Update time immediately as it's less frequent
       setDaysUntilDeparture(data.days_until_departure);
@@ -99,7 +169,10 @@ export default function Home() {
         setDepartureDate(data.departure_date);
       }
     } else if (data.type === "FLIGHT_DEPARTURE") {
-      // Show departure animation and store new flight ID
+      // Show departure animation and store new flight ID; a checkout on the old flight is over
+      pendingPurchases.current.clear();
+      checkoutKey.current = null;
+      setSelectedSeat(null);
       setShowDepartureAnimation(true);
       setCurrentFlightId(data.new_flight);
       // Fetch new flight details to get the new flight number
@@ -139,7 +212,7 @@ export default function Home() {
   }, [currentFlightId]);
 
   // Initialize WebSocket connection with the current flight ID
-  const { sendMessage } = useWebSocket(currentFlightId, handleWebSocketMessage);
+  const { sendMessage } = useWebSocket(currentFlightId, handleWebSocketMessage, 'compact');
 
   // Modify the existing useEffect to only fetch flight data when we have a currentFlightId
   useEffect(() => {
@@ -157,9 +230,19 @@ export default function Home() {
 
   const fetchFlightData = async () => {
     try {
-      // Fetch seats
-      const seatsResponse = await axios.get(`http://localhost:8000/api/v1/flights/${currentFlightId}/seats`);
-      setSeats(seatsResponse.data);
+      // Fetch seats in the compact format, skipping the layout if we already have it
+      const seatsResponse = await axios.get(`http://localhost:8000/api/v1/flights/${currentFlightId}/seats`, {
+        params: { format: 'compact', layout_id: lastLayoutId.current || undefined }
+      });
+      const seatMap = seatsResponse.data;
+      if (seatMap.layout) {
+        seatLayouts.current.set(seatMap.layout_id, seatMap.layout);
+      } else if (!seatLayouts.current.has(seatMap.layout_id)) {
+        const layoutResponse = await axios.get(`http://localhost:8000/api/v1/seat-layouts/${seatMap.layout_id}`);
+        seatLayouts.current.set(seatMap.layout_id, layoutResponse.data);
+      }
+      lastLayoutId.current = seatMap.layout_id;
+      setSeats(decodeSeatMap(seatMap, seatLayouts.current.get(seatMap.layout_id)));
       
       // Fetch flight details including days until departure
       const flightResponse = await axios.get(`http://localhost:8000/api/v1/flights/${currentFlightId}`);
@@ -173,33 +256,64 @@ export default function Home() {
   };
 
   const handleSeatClick = useCallback((seat) => {
-    if (!seat.is_occupied) {
+    if (!seat.is_occupied && !seat.is_held) {
+      // Hold the seat while we check out, and let go of any seat held before
+      if (selectedSeat && selectedSeat.id !== seat.id) {
+        sendMessage({ type: 'SEAT_RELEASE', seat: { id: selectedSeat.id } });
+      }
+      sendMessage({ type: 'SEAT_HOLD', seat: { id: seat.id } });
+      if (!selectedSeat || selectedSeat.id !== seat.id) {
+        checkoutKey.current = `${seat.id}-${Date.now()}`;
+      }
       setSelectedSeat(seat);
     }
-  }, []);
+  }, [selectedSeat, sendMessage]);
+
+  const handleCancel = useCallback(() => {
+    if (selectedSeat) {
+      sendMessage({ type: 'SEAT_RELEASE', seat: { id: selectedSeat.id } });
+    }
+    checkoutKey.current = null;
+    setSelectedSeat(null);
+  }, [selectedSeat, sendMessage]);
 
   const handlePurchase = useCallback(async () => {
     if (!selectedSeat) return;
 
     try {
-      // Send WebSocket message about the seat being purchased
+      // The same key for every send of this checkout, so a resend gets the first result
+      if (!checkoutKey.current) {
+        checkoutKey.current = `${selectedSeat.id}-${Date.now()}`;
+      }
+      const key = checkoutKey.current;
+
+      // Send WebSocket message about the seat being purchased; the server sets the price
       sendMessage({
         type: 'SEAT_UPDATE',
+        idempotency_key: key,
         seat: {
           id: selectedSeat.id,
-          is_occupied: true,
-          sale_price: selectedSeat.base_price // For now, we'll use the base price as the sale price
+          is_occupied: true
         }
       });
 
-      // Update local state immediately for better UX
+      // Update local state immediately for better UX, remembering the seat
+      // as it was in case the purchase is rejected. The seat stays selected
+      // until the server answers, so the purchase can be resent.
       setSeats(prevSeats =>
-        prevSeats.map(seat =>
-          seat.id === selectedSeat.id ? { ...seat, is_occupied: true, sale_price: selectedSeat.base_price } : seat
-        )
+        prevSeats.map(seat => {
+          if (seat.id !== selectedSeat.id) return seat;
+          if (!pendingPurchases.current.has(key)) {
+            pendingPurchases.current.set(key, [{
+              id: seat.id,
+              is_occupied: seat.is_occupied,
+              is_held: seat.is_held,
+              sale_price: seat.sale_price
+            }]);
+          }
+          return { ...seat, is_occupied: true, is_held: false };
+        })
       );
-
-      setSelectedSeat(null);
     } catch (err) {
       console.error('Error purchasing seat:', err);
     }
@@ -259,7 +373,7 @@ export default function Home() {
       
       <SelectedSeatModal 
         selectedSeat={selectedSeat}
-        onCancel={() => setSelectedSeat(null)}
+        onCancel={handleCancel}
         onPurchase={handlePurchase}
       />
       
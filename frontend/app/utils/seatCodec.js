@@ -0,0 +1,82 @@
+// Decoding of the compact seat map format (GET /flights/{id}/seats?format=compact
+// and WebSocket ?format=compact). Seats are addressed by their index in the layout.
+
+const FLAG_WINDOW = 1;
+const FLAG_AISLE = 2;
+const FLAG_MIDDLE = 4;
+const FLAG_EXTRA_LEGROOM = 8;
+
+// [5, 1, 1, 2] -> [5, 6, 7, 9]
+const deltaDecode = (deltas) => {
+  let value = 0;
+  return deltas.map(delta => (value += delta));
+};
+
+const decodeBitset = (encoded, length) => {
+  const bytes = atob(encoded);
+  const bits = new Array(length);
+  for (let i = 0; i < length; i++) {
+    bits[i] = ((bytes.charCodeAt(i >> 3) >> (i & 7)) & 1) === 1;
+  }
+  return bits;
+};
+
+// Occupancy of every seat as partial seat objects, in layout order.
+// Days until departure are only sent for sold seats.
+const decodeOccupancy = (seatMap) => {
+  const count = seatMap.seat_ids.length;
+  const occupied = decodeBitset(seatMap.occupied, count);
+  let sold = 0;
+  return occupied.map(isOccupied => {
+    if (!isOccupied) {
+      return { is_occupied: false, sale_price: null };
+    }
+    const state = {
+      is_occupied: true,
+      sale_price: seatMap.sale_prices[sold],
+      days_until_departure: seatMap.sold_days[sold]
+    };
+    sold += 1;
+    return state;
+  });
+};
+
+// A compact seat map and its layout -> the same seat objects the JSON format returns
+export const decodeSeatMap = (seatMap, layout) => {
+  const ids = deltaDecode(seatMap.seat_ids);
+  const rows = deltaDecode(layout.rows);
+  const occupancy = decodeOccupancy(seatMap);
+  return ids.map((id, i) => ({
+    id,
+    row_number: rows[i],
+    seat_letter: layout.letters[i],
+    class_type: layout.classes[layout.class_codes[i]],
+    is_window: (layout.flags[i] & FLAG_WINDOW) !== 0,
+    is_aisle: (layout.flags[i] & FLAG_AISLE) !== 0,
+    is_middle: (layout.flags[i] & FLAG_MIDDLE) !== 0,
+    is_extra_legroom: (layout.flags[i] & FLAG_EXTRA_LEGROOM) !== 0,
+    base_price: layout.base_prices[i],
+    ...occupancy[i]
+  }));
+};
+
+// Apply a compact SNAPSHOT to seats already decoded in layout order
+export const applySnapshot = (seats, snapshot) => {
+  const occupancy = decodeOccupancy(snapshot);
+  return seats.map((seat, i) => (occupancy[i] ? { ...seat, ...occupancy[i] } : seat));
+};
+
+// Apply a compact BATCH_UPDATE's index deltas to seats in layout order
+export const applyUpdates = (seats, message) => {
+  const changes = new Map();
+  let index = 0;
+  (message.sold || []).forEach(([delta, salePrice, days]) => {
+    index += delta;
+    changes.set(index, { is_occupied: true, sale_price: salePrice, days_until_departure: days });
+  });
+  deltaDecode(message.freed || []).forEach(i => {
+    changes.set(i, { is_occupied: false, sale_price: null });
+  });
+  if (changes.size === 0) return seats;
+  return seats.map((seat, i) => (changes.has(i) ? { ...seat, ...changes.get(i) } : seat));
+};
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Simulate flights offline to generate synthetic purchase history.
+
+Each flight is sold by the same bot model the live server runs (demand
+curve, seat choice and adjacent seats from BotService, priced like every
+sale), stepped tick by tick like the simulation engine but with no
+clock, sleeping, broadcasts or database writes. Flights are spread over
+a process pool; every flight gets its own seed derived from --seed, so
+a run gives the same history whatever the number of workers.
+
+Examples:
+    # Ten years of daily flights to a CSV in the export_purchase_history.py format
+    python scripts/simulate_purchase_history.py --flights 3650 --output data/synthetic_purchase_history.csv
+
+    # Store the history as PurchaseHistory rows instead
+    python scripts/simulate_purchase_history.py --flights 3650 --db
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from backend.config.config import settings
+from backend.utils.constants import get_seat_layout
+from backend.services.inventory_service import inventory_service
+from backend.services.bot_service import BotService
+from backend.services.pricing import calculate_sale_price
+
+# Days before departure a flight goes on sale, as for flights created by the server
+BOOKING_DAYS = 120
+CLASSES = ('first', 'business', 'economy')
+
+# (flight number, departure date, class -> {days until departure: purchases})
+FlightHistory = Tuple[str, datetime, Dict[str, Dict[int, int]]]
+
+def flight_seed(seed: int, index: int) -> int:
+    """An independent seed for each flight, the same whichever process simulates it"""
+    return int(np.random.SeedSequence([seed, index]).generate_state(1)[0])
+
+def layout_seats() -> List[dict]:
+    """Seat dicts for the server's default aircraft configuration"""
+    layout = get_seat_layout(30, 4, 8, (1, 15, 16), 500.0, 300.0, 150.0, 10.0, 10.0)
+    return [{'id': seat_id, **seat} for seat_id, seat in enumerate(layout.seats, start=1)]
+
+def simulate_flight(index: int, seed: int, hours_per_tick: int, bot_steps_per_tick: int) -> Dict[str, Dict[int, int]]:
+    """
+    Sell one flight from BOOKING_DAYS out until departure.
+    Returns its purchases per class per days until departure.
+    """
+    bots = BotService(seed=flight_seed(seed, index))
+    flight_id = index + 1
+    inventory = inventory_service.load(flight_id, layout_seats())
+    try:
+        hours = BOOKING_DAYS * 24
+        while hours > 0:
+            days_remaining = hours // 24
+            for _ in range(bot_steps_per_tick):
+                seat = bots._choose_purchase(flight_id, days_remaining, inventory.available_by_class)
+                if seat is None:
+                    continue
+                for sold_seat in bots._reserve_group(flight_id, seat):
+                    sale_price, _, _ = calculate_sale_price(sold_seat, days_remaining)
+                    inventory.commit(sold_seat['id'], sale_price, days_remaining)
+            hours = max(0, hours - hours_per_tick)
+        return inventory.purchase_counts()
+    finally:
+        inventory_service.evict(flight_id)
+
+def simulate_flights(job: Tuple[List[Tuple[int, str, datetime]], int, int, int]) -> List[FlightHistory]:
+    """Simulate a chunk of flights; runs in a worker process"""
+    flights, seed, hours_per_tick, bot_steps_per_tick = job
+    return [
+        (flight_number, departure_date, simulate_flight(index, seed, hours_per_tick, bot_steps_per_tick))
+        for index, flight_number, departure_date in flights
+    ]
+
+def schedule(count: int, first_departure: date, flights_per_day: int, prefix: str) -> List[Tuple[int, str, datetime]]:
+    """Flight numbers and departures: flights_per_day flights a day, departing at 12:00"""
+    flights = []
+    for index in range(count):
+        departure_day = first_departure + timedelta(days=index // flights_per_day)
+        departure_date = datetime.combine(departure_day, datetime.strptime('12:00', '%H:%M').time())
+        flights.append((index, f"{prefix}{index + 1:05d}", departure_date))
+    return flights
+
+def run(flights: List[Tuple[int, str, datetime]], seed: int, workers: int, chunk_size: int,
+        hours_per_tick: int, bot_steps_per_tick: int) -> Iterable[FlightHistory]:
+    """Simulate every flight over a process pool, yielding histories in schedule order"""
+    jobs = [
+        (flights[start:start + chunk_size], seed, hours_per_tick, bot_steps_per_tick)
+        for start in range(0, len(flights), chunk_size)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for histories in executor.map(simulate_flights, jobs):
+            yield from histories
+
+def write_csv(histories: Iterable[FlightHistory], filepath: str) -> int:
+    """Write histories in the format of export_purchase_history.py; returns the number of rows"""
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    rows = 0
+    with open(filepath, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow([
+            'purchase_date', 'day_of_week', 'month', 'is_weekend', 'days_until_departure',
+            'purchases', 'flight_number', 'class_type', 'departure_date'
+        ])
+        for flight_number, departure_date, class_purchases in histories:
+            for class_type in CLASSES:
+                for days_until, purchases in sorted(class_purchases.get(class_type, {}).items(), reverse=True):
+                    purchase_date = departure_date - timedelta(days=days_until)
+                    writer.writerow([
+                        purchase_date.strftime('%Y-%m-%d'),
+                        purchase_date.weekday(),
+                        purchase_date.month,
+                        1 if purchase_date.weekday() >= 5 else 0,
+                        days_until,
+                        purchases,
+                        flight_number,
+                        class_type,
+                        departure_date.strftime('%Y-%m-%d %H:%M:%S')
+                    ])
+                    rows += 1
+    return rows
+
+def write_db(histories: Iterable[FlightHistory], batch_size: int = 500) -> int:
+    """Store histories as PurchaseHistory rows, one per flight and class; returns the number of rows"""
+    from sqlalchemy import insert
+    from backend.db.database import SessionLocal
+    from backend.models.purchase_history import PurchaseHistory
+
+    db = SessionLocal()
+    rows = 0
+    batch = []
+    try:
+        for flight_number, departure_date, class_purchases in histories:
+            for class_type in CLASSES:
+                batch.append({
+                    'flight_number': flight_number,
+                    'class_type': class_type,
+                    'daily_purchases': {str(day): count for day, count in class_purchases.get(class_type, {}).items()},
+                    'departure_date': departure_date
+                })
+            if len(batch) >= batch_size:
+                db.execute(insert(PurchaseHistory), batch)
+                db.commit()
+                rows += len(batch)
+                batch = []
+        if batch:
+            db.execute(insert(PurchaseHistory), batch)
+            db.commit()
+            rows += len(batch)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return rows
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulate flights offline to generate synthetic purchase history")
+    parser.add_argument('--flights', type=int, default=365, help="Number of flights to simulate")
+    parser.add_argument('--flights-per-day', type=int, default=1, help="Flights departing each day")
+    parser.add_argument('--first-departure', type=date.fromisoformat, default=None,
+                        help="Departure date of the first flight (YYYY-MM-DD); defaults to ending the schedule today")
+    parser.add_argument('--prefix', default="SIM", help="Flight number prefix, keeping synthetic flights apart from live ones")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the whole run")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--chunk-size', type=int, default=50, help="Flights per task sent to a worker")
+    parser.add_argument('--hours-per-tick', type=int, default=settings.SIMULATION_HOURS_PER_TICK)
+    parser.add_argument('--bot-steps-per-tick', type=int, default=settings.SIMULATION_BOT_STEPS_PER_TICK)
+    parser.add_argument('--output', default=os.path.join(project_root, 'data', 'synthetic_purchase_history.csv'),
+                        help="CSV file to write")
+    parser.add_argument('--db', action='store_true', help="Store PurchaseHistory rows in the database instead of a CSV")
+    args = parser.parse_args(argv)
+    if args.flights < 1 or args.flights_per_day < 1 or args.chunk_size < 1 or args.hours_per_tick < 1:
+        parser.error("--flights, --flights-per-day, --chunk-size and --hours-per-tick must be positive")
+    if args.first_departure is None:
+        args.first_departure = date.today() - timedelta(days=(args.flights - 1) // args.flights_per_day)
+    return args
+
+def main(argv: List[str] = None):
+    """Main entry point for the script."""
+    args = parse_args(argv)
+    flights = schedule(args.flights, args.first_departure, args.flights_per_day, args.prefix)
+    started = time.perf_counter()
+    histories = run(flights, args.seed, args.workers, args.chunk_size, args.hours_per_tick, args.bot_steps_per_tick)
+    try:
+        if args.db:
+            rows = write_db(histories)
+            destination = "purchase_history table"
+        else:
+            rows = write_csv(histories, args.output)
+            destination = args.output
+    except Exception as e:
+        print(f"Error simulating purchase history: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+    print(f"Simulated {len(flights)} flights departing {flights[0][2]:%Y-%m-%d} to {flights[-1][2]:%Y-%m-%d} "
+          f"in {elapsed:.1f}s; wrote {rows} rows to {destination}")
+
+if __name__ == "__main__":
+    main()
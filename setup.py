@@ -10,5 +10,6 @@ setup(
         "sqlalchemy",
         "pydantic",
         "websockets",
+        "numpy",
     ],
 ) 
\ No newline at end of file
@@ -0,0 +1,7 @@
+import os
+
+# Settings are read at import time: keep tests off the real database, the
+# background clock and the checkpoint file
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SIMULATION_CLOCK_MODE", "manual")
+os.environ.setdefault("SIMULATION_CHECKPOINT_PATH", "")
@@ -0,0 +1,69 @@
+from backend.services.seat_grid import SIDES, SeatGrid
+
+LETTERS = [letter for side in SIDES for letter in side]
+
+def make_grid(rows, occupied=(), business_rows=0):
+    """A grid of `rows` rows, business class first, with the (row, letter) seats in `occupied` taken"""
+    seats = []
+    for row in range(1, rows + 1):
+        for letter in LETTERS:
+            seats.append({
+                'id': len(seats) + 1,
+                'row_number': row,
+                'seat_letter': letter,
+                'class_type': 'business' if row <= business_rows else 'economy',
+                'is_occupied': (row, letter) in occupied,
+            })
+    return SeatGrid(seats), {seat['id']: seat for seat in seats}
+
+def placed(seats, seat_ids):
+    """Row -> side -> letters of the seats a group was given"""
+    rows = {}
+    for seat_id in seat_ids:
+        seat = seats[seat_id]
+        side = next(i for i, letters in enumerate(SIDES) if seat['seat_letter'] in letters)
+        rows.setdefault(seat['row_number'], {}).setdefault(side, []).append(seat['seat_letter'])
+    return rows
+
+def assert_adjacent(seats, seat_ids, size):
+    assert len(seat_ids) == size == len(set(seat_ids))
+    rows = placed(seats, seat_ids)
+    # Consecutive rows, every row but the last filling both sides of the aisle
+    assert sorted(rows) == list(range(min(rows), min(rows) + len(rows)))
+    for row in sorted(rows)[:-1]:
+        assert sum(len(letters) for letters in rows[row].values()) == len(LETTERS)
+    # An unbroken run of seats on each side
+    for sides in rows.values():
+        for side, letters in sides.items():
+            indices = sorted(SIDES[side].index(letter) for letter in letters)
+            assert indices == list(range(indices[0], indices[0] + len(indices)))
+
+def test_group_wider_than_a_side_stays_in_one_row():
+    # Row 1 only has one side free, row 2 is full: the group must not take row 1 and row 3
+    occupied = {(1, letter) for letter in SIDES[1]} | {(2, letter) for letter in LETTERS}
+    grid, seats = make_grid(4, occupied)
+    seat_ids = grid.find_group(5, 'economy')
+    assert_adjacent(seats, seat_ids, 5)
+    assert set(placed(seats, seat_ids)) == {3}
+
+def test_group_wider_than_a_row_takes_consecutive_rows():
+    # Row 1 has only one side with a free run of three: the group starts at row 2
+    occupied = {(1, 'B')}
+    grid, seats = make_grid(4, occupied)
+    seat_ids = grid.find_group(8, 'economy')
+    assert_adjacent(seats, seat_ids, 8)
+    assert set(placed(seats, seat_ids)) == {2, 3}
+
+def test_group_stays_in_its_class():
+    grid, seats = make_grid(4, business_rows=2)
+    seat_ids = grid.find_group(8, 'economy')
+    assert_adjacent(seats, seat_ids, 8)
+    assert set(placed(seats, seat_ids)) == {3, 4}
+    assert grid.find_group(13, 'business') is None
+
+def test_group_without_an_adjacent_placement_does_not_fit():
+    # Eight free seats, but no row has a free side next to another free block
+    occupied = {(row, letter) for row in range(1, 5) for letter in LETTERS if letter not in ('A', 'B')}
+    grid, seats = make_grid(4, occupied)
+    assert grid.find_group(4, 'economy') is None
+    assert_adjacent(seats, grid.find_group(2, 'economy'), 2)
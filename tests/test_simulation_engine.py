@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from backend.config.config import settings
+from backend.services.sim_clock import ManualClock, SimulationClock
+from backend.services.simulation_engine import simulation_engine
+from backend.services.countdown_service import countdown_service
+from backend.services.departure_service import departure_service
+from backend.utils.constants import flight_state_manager
+from backend.websocket.frame_aggregator import frame_aggregator
+
+@pytest.fixture
+def manual_engine(monkeypatch):
+    """The global engine on a fresh manual clock, with departures and frames recorded instead of run"""
+    events = []
+    monkeypatch.setattr(departure_service, "submit",
+                        lambda flight_id: events.append(("departure", flight_id, simulation_engine.clock.now())))
+    monkeypatch.setattr(frame_aggregator, "publish_time",
+                        lambda flight_id, days, hours: events.append(("tick", flight_id, days * 24 + hours)))
+    previous_clock = simulation_engine.clock
+    simulation_engine.set_clock(ManualClock())
+    yield events
+    for flight_id in simulation_engine.flight_ids():
+        simulation_engine.remove_timer(flight_id)
+        simulation_engine.remove_bots(flight_id)
+        flight_state_manager.remove(flight_id)
+    simulation_engine.set_clock(previous_clock)
+
+def test_simulation_clock_is_abstract():
+    with pytest.raises(TypeError):
+        SimulationClock()
+
+def test_manual_clock_fires_each_countdown_tick_and_departure_once_in_order(manual_engine):
+    events = manual_engine
+    step = settings.SIMULATION_HOURS_PER_TICK
+
+    async def run():
+        countdown_service.start_timer(1, 2 * step)
+        countdown_service.start_timer(2, 3 * step)
+        # Advance in uneven steps, well past both departures
+        for hours in [1, step, 0.5, 2 * step, step - 1.5, 5 * step]:
+            await simulation_engine.advance(hours)
+
+    asyncio.run(run())
+
+    assert events == [
+        ("tick", 1, 2 * step), ("tick", 2, 3 * step),
+        ("tick", 1, step), ("departure", 1, step), ("tick", 2, 2 * step),
+        ("tick", 2, step), ("departure", 2, 2 * step),
+    ]
+    assert not simulation_engine.has_timer(1) and not simulation_engine.has_timer(2)
+
+def test_countdown_follows_the_engine_tick_length(manual_engine, monkeypatch):
+    events = manual_engine
+    step = settings.SIMULATION_HOURS_PER_TICK + 1
+    monkeypatch.setattr(simulation_engine, "hours_per_tick", step)
+
+    async def run():
+        countdown_service.start_timer(1, 3 * step)
+        for _ in range(5):
+            await simulation_engine.advance(step)
+
+    asyncio.run(run())
+
+    assert events == [
+        ("tick", 1, 3 * step), ("tick", 1, 2 * step), ("tick", 1, step), ("departure", 1, 2 * step),
+    ]